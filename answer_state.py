@@ -0,0 +1,191 @@
+# answer_state.py
+
+import base64
+import sys
+import threading
+import time
+
+from questions import questions_data
+
+# --- 1. 設問の並び ---
+# 回答は questions_data の順 (カテゴリ順 × 設問順) に 48 個並べる
+CATEGORIES = tuple(questions_data.keys())
+QUESTIONS_PER_CATEGORY = 8
+N_QUESTIONS = len(CATEGORIES) * QUESTIONS_PER_CATEGORY
+ANSWER_BITS = 3
+PACKED_BYTES = N_QUESTIONS * ANSWER_BITS // 8  # 18 bytes (response_store.pack_answers と同じビット配置)
+DEFAULT_ANSWER = 3
+
+# スライダーのキー f"{category}_{i}" → (回答の位置, カテゴリの位置)
+SLIDER_KEYS = {
+    f"{category}_{i}": (c * QUESTIONS_PER_CATEGORY + i, c)
+    for c, category in enumerate(CATEGORIES)
+    for i in range(QUESTIONS_PER_CATEGORY)
+}
+
+
+# --- 2. 1セッション分の回答 ---
+class AnswerState:
+    """48問の回答とカテゴリ合計を固定長の bytearray で持つ
+
+    1セッションあたり 48 + 6 バイト (+ オブジェクト本体) で、回答1つの変更は合計の差分更新だけ。
+    """
+
+    __slots__ = ("answers", "sums")
+
+    def __init__(self, answers=None):
+        self.answers = bytearray(answers) if answers is not None else bytearray([DEFAULT_ANSWER]) * N_QUESTIONS
+        if len(self.answers) != N_QUESTIONS or min(self.answers) < 1 or max(self.answers) > 5:
+            raise ValueError(f"回答は 1〜5 の整数 {N_QUESTIONS} 個である必要があります")
+        self.sums = bytearray(
+            sum(self.answers[c * QUESTIONS_PER_CATEGORY:(c + 1) * QUESTIONS_PER_CATEGORY]) for c in range(len(CATEGORIES))
+        )
+
+    def get(self, slider_key):
+        return self.answers[SLIDER_KEYS[slider_key][0]]
+
+    def set(self, slider_key, value):
+        """1問の回答を変更し、そのカテゴリの合計を差分で更新する"""
+        index, c = SLIDER_KEYS[slider_key]
+        self.sums[c] += value - self.answers[index]
+        self.answers[index] = value
+
+    def category_sums(self):
+        """{カテゴリ: 8問の合計}"""
+        return dict(zip(CATEGORIES, self.sums))
+
+    def category_means(self):
+        """{カテゴリ: 8問の平均}"""
+        return {category: s / QUESTIONS_PER_CATEGORY for category, s in zip(CATEGORIES, self.sums)}
+
+    # --- 永続化 (1問3ビット × 48 = 18 bytes) ---
+    def pack(self):
+        bits = 0
+        for a in self.answers:
+            bits = (bits << ANSWER_BITS) | (a - 1)
+        return bits.to_bytes(PACKED_BYTES, "big")
+
+    @classmethod
+    def unpack(cls, packed):
+        if len(packed) != PACKED_BYTES:
+            raise ValueError(f"{PACKED_BYTES} bytes である必要があります")
+        bits = int.from_bytes(packed, "big")
+        mask = (1 << ANSWER_BITS) - 1
+        return cls((bits >> (ANSWER_BITS * (N_QUESTIONS - 1 - k)) & mask) + 1 for k in range(N_QUESTIONS))
+
+    def token(self):
+        """URL に載せられる24文字の文字列 (base64url)"""
+        return base64.urlsafe_b64encode(self.pack()).decode("ascii")
+
+    @classmethod
+    def from_token(cls, token):
+        """token() の逆。壊れた文字列なら None"""
+        try:
+            return cls.unpack(base64.urlsafe_b64decode(token.encode("ascii")))
+        except (ValueError, UnicodeError):
+            return None
+
+
+# --- 3. アイドルセッションの退避 ---
+class IdleSessionEvictor:
+    """一定時間再実行のないセッションを閉じてメモリを返す
+
+    回答・名前・結果表示の有無は URL (?a=<token> / ?n= / ?done=1) に常に書き出しているので、閉じられたセッションの
+    ブラウザが再接続すると新しいセッションがそこから復元する。閉じた後に残るのはブラウザ側の URL だけになる。
+    Streamlit の非公開 API (Runtime._get_async_objs, クライアントの _websocket) を使うので、無い版では何もしない。
+    """
+
+    def __init__(self, idle_ttl, interval=None):
+        self.idle_ttl = idle_ttl
+        self.interval = interval or min(60.0, idle_ttl)
+        self.evicted = 0
+        self._last_seen = {}
+        self._lock = threading.Lock()
+        threading.Thread(target=self._run, name="idle-session-evictor", daemon=True).start()
+
+    def touch(self, session_id):
+        with self._lock:
+            self._last_seen[session_id] = time.monotonic()
+
+    def idle_sessions(self):
+        now = time.monotonic()
+        with self._lock:
+            return [s for s, seen in self._last_seen.items() if now - seen > self.idle_ttl]
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            idle = self.idle_sessions()
+            if idle and self.evict(idle) is False:
+                return
+
+    def evict(self, session_ids):
+        from streamlit import runtime
+
+        if not runtime.exists():
+            return
+        rt = runtime.get_instance()
+        # close_session と WebSocket の close はイベントループのスレッドで呼ぶ必要がある。
+        # ループは Streamlit の非公開 API からしか取れないので、無ければ退避せずに記録だけ残す
+        get_async_objs = getattr(rt, "_get_async_objs", None)
+        loop = getattr(get_async_objs(), "eventloop", None) if get_async_objs is not None else None
+        if loop is None:
+            print("[idle-evictor] このバージョンの Streamlit ではイベントループを取得できないため退避を止めます", file=sys.stderr)
+            return False
+        for session_id in session_ids:
+            with self._lock:
+                self._last_seen.pop(session_id, None)
+            loop.call_soon_threadsafe(self._close, rt, loop, session_id)
+
+    def _close(self, rt, loop, session_id):
+        try:
+            client = rt.get_client(session_id)
+            rt.close_session(session_id)
+            self.evicted += 1
+            # WebSocket も切る。ブラウザは自動で再接続し、新しいセッションが URL から回答・名前・結果を復元する
+            if hasattr(client, "close"):  # Tornado サーバー
+                client.close()
+            elif hasattr(client, "_websocket"):  # Starlette サーバー
+                loop.create_task(client._websocket.close())
+        except Exception as e:
+            print(f"[idle-evictor] セッション {session_id} を閉じられませんでした: {type(e).__name__}: {e}", file=sys.stderr)
+
+
+# --- 4. セッションあたりのメモリ ---
+def deep_sizeof(obj, seen=None):
+    """オブジェクトと、そこから辿れるコンテナ・文字列の合計バイト数 (共有される小さな int などは除く)"""
+    seen = set() if seen is None else seen
+    if id(obj) in seen or isinstance(obj, (bool, type(None))) or (isinstance(obj, int) and -5 <= obj <= 256):
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(v, seen) for v in obj)
+    elif hasattr(obj, "__slots__"):
+        size += sum(deep_sizeof(getattr(obj, name), seen) for name in obj.__slots__)
+    return size
+
+def session_bytes_report():
+    """回答の状態1セッション分のバイト数 {表現: bytes}
+
+    - AnswerState: bytearray 2本の __slots__ オブジェクト (スライダーは key なしなので st.session_state に設問ごとの値はない)
+    - token (URL): ブラウザ側の URL に置く分
+    - evicted: 退避後にサーバーに残る量 (token はブラウザ側の URL にあるので 0)
+
+    セッション全体 (ウィジェット・フラグメントを含む) のメモリは
+    python load_test.py --launch --session-memory 40 で実測する (--app-dir で別チェックアウトと比べられる)。
+    """
+    state = AnswerState()
+    return {
+        "AnswerState": deep_sizeof(state),
+        "token (URL)": len(state.token()),
+        "evicted": 0,
+    }
+
+
+if __name__ == "__main__":
+    # 使い方: python answer_state.py  (回答の状態1セッション分のバイト数を表示)
+    for name, size in session_bytes_report().items():
+        print(f"{name:<12} {size:>6,} bytes")
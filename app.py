@@ -1,12 +1,58 @@
 import streamlit as st
-import pandas as pd
-import plotly.graph_objects as go
-import statistics
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+import os
+import time
 
-# ▼ 3つのモジュールからそれぞれデータをインポート
-from questions import questions_data
-from feedback import definitions
-from archetypes import calculate_archetype
+_imports_started = time.perf_counter()
+
+# ▼ 各モジュールからデータ・描画処理をインポート
+from content import current as current_content
+from answer_state import AnswerState, IdleSessionEvictor
+from result_view import render_result, render_sensitivity, show_result
+from startup_profiler import report_first_render
+import metrics
+import permalink
+
+_run_started = time.perf_counter()
+
+# --- メトリクス (Prometheus テキスト形式) ---
+# LIFE_MAPPING_METRICS_PORT を設定するとそのポートで /metrics を公開 (既定では 127.0.0.1 のみ。
+# 外から取得させるときは LIFE_MAPPING_METRICS_HOST=0.0.0.0 など)、
+# LIFE_MAPPING_METRICS_FILE を設定すると node_exporter の textfile collector 向けに書き出す
+METRICS_PORT = os.environ.get("LIFE_MAPPING_METRICS_PORT", "")
+METRICS_HOST = os.environ.get("LIFE_MAPPING_METRICS_HOST", "127.0.0.1")
+METRICS_FILE = os.environ.get("LIFE_MAPPING_METRICS_FILE", "")
+
+@st.cache_resource
+def start_metrics_server():
+    # プロセスごとに1回だけ起動する
+    return metrics.start_http_server(int(METRICS_PORT), METRICS_HOST) if METRICS_PORT else None
+
+start_metrics_server()
+
+# --- 共有リンクの鍵 ---
+# 複数レプリカ (LIFE_MAPPING_REPLICAS > 1) で共通の鍵が設定されていなければ、リンクを発行する前にここで止める
+permalink.secret_key()
+
+# --- アイドルセッションの退避 ---
+# LIFE_MAPPING_IDLE_TTL 秒 再実行のないセッションを閉じる (既定 0 = 無効。例: 1800 で30分)。
+# 回答・名前・結果を表示していたかは URL (?a= / ?n= / ?done=1) に保存してあるので、再接続すると復元される
+IDLE_TTL = int(os.environ.get("LIFE_MAPPING_IDLE_TTL", "0"))
+
+@st.cache_resource
+def get_idle_evictor():
+    return IdleSessionEvictor(IDLE_TTL) if IDLE_TTL > 0 else None
+
+idle_evictor = get_idle_evictor()
+
+def touch_session():
+    """このセッションが動いていることを記録 (アクティブセッション数・アイドル判定用)"""
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return
+    metrics.touch_session(ctx.session_id)
+    if idle_evictor is not None:
+        idle_evictor.touch(ctx.session_id)
 
 # --- ページ設定 ---
 st.set_page_config(
@@ -16,18 +62,32 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
+# --- 文言 (content/*.json。ファイルが更新されると再起動なしで次の再実行から反映される) ---
+# 1回の再実行の中では同じ版を使う
+site_content = current_content()
+
 # --- セッションステート初期化 (名前同期用) ---
+# 退避されたセッションの再接続時は URL の ?n= から復元する
 if "shared_name" not in st.session_state:
-    st.session_state["shared_name"] = ""
+    st.session_state["shared_name"] = st.query_params.get("n", "")
+
+def save_name(name):
+    """名前を共有変数と URL に保存する (名前が変わったら表示中の結果は古くなる)"""
+    st.session_state["shared_name"] = name
+    if name:
+        st.query_params["n"] = name
+    else:
+        st.query_params.pop("n", None)
+    st.query_params.pop("done", None)
 
 # --- コールバック関数 (同期ロジック) ---
 def sync_name_from_top():
     """上の入力欄が変更されたら、共有変数に反映"""
-    st.session_state["shared_name"] = st.session_state.name_top
+    save_name(st.session_state.name_top)
 
 def sync_name_from_bottom():
     """下の入力欄が変更されたら、共有変数に反映"""
-    st.session_state["shared_name"] = st.session_state.name_bottom
+    save_name(st.session_state.name_bottom)
 
 # --- CSS (デザイン調整) ---
 st.markdown("""
@@ -55,6 +115,20 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# --- 共有リンク (?r=<token>) なら設問を出さずに結果だけを描画する ---
+# トークンに回答と名前が入っているので、どのプロセス・レプリカでも同じ結果を再現できる (セッションに依存しない)
+if "r" in st.query_params:
+    st.markdown('<div class="main-header">Life Mapping Diagnosis</div>', unsafe_allow_html=True)
+    try:
+        shared_name, parts = permalink.load_result(st.query_params["r"], st.query_params.get("chart", "plotly"))
+    except permalink.InvalidToken:
+        st.error("このリンクは無効です。")
+    else:
+        show_result(shared_name, parts, celebrate=False)
+    st.markdown("[👉 あなたも診断してみる](?)")
+    metrics.inc("life_mapping_reruns_total", kind="permalink")
+    st.stop()
+
 # --- UI構築 ---
 
 st.markdown('<div class="main-header">Life Mapping Diagnosis</div>', unsafe_allow_html=True)
@@ -84,7 +158,6 @@ st.text_input(
 )
 
 st.markdown("---")
-user_scores = {}
 
 # 選択肢の定義
 options = {
@@ -95,59 +168,173 @@ options = {
     5: "非常に当てはまる"
 }
 
-# カテゴリごとにループ
-for category, q_list in questions_data.items():
-    st.markdown(f'<div class="category-header">{category}</div>', unsafe_allow_html=True)
-    
-    cat_answers = []
-    for i, q_text in enumerate(q_list):
-        # 1. 質問文
-        st.markdown(f"**Q.{i+1} {q_text}**")
-        
-        # スライダーのキーを定義
-        slider_key = f"{category}_{i}"
-        
-        # 現在の値を取得（セッションステートにあればそれを、なければデフォルト3）
-        if slider_key in st.session_state:
-            current_val = st.session_state[slider_key]
+def build_legend_html(current_val):
+    """全選択肢をスライダーの上に表示 (選択中のみハイライト)"""
+    legend_html = ""
+    for k, v in options.items():
+        if k == current_val:
+            # 選択中のスタイル
+            if k <= 2: color = "#ef4444"   # 赤
+            elif k == 3: color = "#f97316" # オレンジ
+            else: color = "#3b82f6"        # 青
+            
+            legend_html += f"<span style='color: {color}; font-weight: bold; font-size: 1.1rem; margin: 0 8px; display: inline-block;'>{k}. {v}</span>"
         else:
-            current_val = 3
-        
-        # 2. 全選択肢をスライダーの上に表示 (選択中のみハイライト)
-        legend_html = ""
-        for k, v in options.items():
-            if k == current_val:
-                # 選択中のスタイル
-                if k <= 2: color = "#ef4444"   # 赤
-                elif k == 3: color = "#f97316" # オレンジ
-                else: color = "#3b82f6"        # 青
-                
-                legend_html += f"<span style='color: {color}; font-weight: bold; font-size: 1.1rem; margin: 0 8px; display: inline-block;'>{k}. {v}</span>"
-            else:
-                # 非選択のスタイル
-                legend_html += f"<span style='color: #cbd5e1; font-size: 0.8rem; margin: 0 5px; display: inline-block;'>{k}. {v}</span>"
-
-        st.markdown(f"""
+            # 非選択のスタイル
+            legend_html += f"<span style='color: #cbd5e1; font-size: 0.8rem; margin: 0 5px; display: inline-block;'>{k}. {v}</span>"
+
+    return f"""
         <div style="text-align: center; line-height: 1.8; margin-bottom: 5px;">
             {legend_html}
         </div>
-        """, unsafe_allow_html=True)
-        
-        # 3. スライダー (ラベルなし)
-        val = st.select_slider(
-            label="回答", 
-            options=[1, 2, 3, 4, 5],
-            value=3, 
-            key=slider_key,
-            label_visibility="collapsed"
-        )
-        
-        cat_answers.append(val)
+        """
+
+# 凡例HTMLは選択値ごとに5通りしかないので、最初に1回だけ作っておく
+with metrics.span("legend"):
+    LEGEND_HTML = {k: build_legend_html(k) for k in options}
+
+# --- 回答の状態 (48問の回答とカテゴリ合計を1つの AnswerState に詰めて持つ) ---
+# 退避されたセッションの再接続時は URL の ?a= から復元し、結果を表示していた (?done=1) なら結果ももう一度出す
+if "answer_state" not in st.session_state:
+    st.session_state["answer_state"] = AnswerState.from_token(st.query_params.get("a", "")) or AnswerState()
+    st.session_state["restore_result"] = st.query_params.get("done") == "1"
+    # スライダーの初期値 (セッション開始時の回答)。キーのないウィジェットは初期値込みで識別されるので、セッション中は変えない
+    st.session_state["slider_defaults"] = AnswerState.unpack(st.session_state["answer_state"].pack())
+answer_state = st.session_state["answer_state"]
+slider_defaults = st.session_state["slider_defaults"]
+
+def update_answer(slider_key, value):
+    """回答が変わったとき: 回答とカテゴリ合計を差分で更新し、URL にも保存する"""
+    answer_state.set(slider_key, value)
+    st.query_params["a"] = answer_state.token()
+    st.query_params.pop("done", None)
+
+# --- 計測モード (?perf=1 で各再実行の所要時間を表示) ---
+perf_mode = st.query_params.get("perf") == "1"
+
+def record_rerun(kind, started):
+    """再実行の所要時間 (ms) を記録し、計測モードなら表示する"""
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    st.session_state.setdefault("perf_log", []).append((kind, elapsed_ms))
+    st.caption(f"⏱ {kind} rerun: {elapsed_ms:.1f} ms")
+
+def render_question(category, i, q_text):
+    # 1. 質問文
+    st.markdown(f"**Q.{i+1} {q_text}**")
+    
+    # AnswerState の中での位置 (st.session_state のキーではない)
+    slider_key = f"{category}_{i}"
     
-    user_scores[category] = statistics.mean(cat_answers)
+    # 2. 全選択肢をスライダーの上に表示 (選択中のみハイライト)。値はスライダーの戻り値で決まるので場所だけ先に取る
+    legend = st.empty()
+    
+    # 3. スライダー (ラベルは読み上げ用で非表示)
+    # key を付けないので st.session_state に設問ごとの値を持たない。今の値は戻り値で受け取って AnswerState に反映する
+    value = st.select_slider(
+        label=f"{category} Q.{i+1}",
+        options=[1, 2, 3, 4, 5],
+        value=slider_defaults.get(slider_key), 
+        label_visibility="collapsed",
+    )
+    if value != answer_state.get(slider_key):
+        update_answer(slider_key, value)
+    legend.markdown(LEGEND_HTML[value], unsafe_allow_html=True)
+
+# カテゴリごとにフラグメント化: スライダーを動かしても、そのカテゴリの8問だけが再実行される
+# (1問ごとだとフラグメントの保存分がセッションあたり48個になり、1セッションのメモリが増える)
+@st.fragment
+def render_category(category, q_list):
+    started = time.perf_counter()
+
+    for i, q_text in enumerate(q_list):
+        render_question(category, i, q_text)
+
+    # 表示中の結果と回答が食い違ったら、全体を再実行して結果を消す (フラグメントの再実行では結果欄は変わらない)
+    shown = st.session_state.get("shown_result")
+    if shown is not None and shown != bytes(answer_state.answers):
+        st.session_state.pop("shown_result")
+        st.rerun(scope="app")
+
+    if perf_mode:
+        record_rerun("question", started)
+
+    # このカテゴリだけの再実行 (スライダー操作) ならここで1回分として数える
+    ctx = get_script_run_ctx()
+    if ctx is not None and ctx.fragment_ids_this_run:
+        metrics.observe("life_mapping_stage_seconds", time.perf_counter() - started, stage="question")
+        metrics.inc("life_mapping_reruns_total", kind="question")
+        touch_session()
+        if METRICS_FILE:
+            metrics.maybe_write_textfile(METRICS_FILE)
+
+# 全体の再実行では結果欄を描き直すので、表示中の結果の記録はいったん消す (結果を表示したら下で記録する)
+st.session_state.pop("shown_result", None)
+
+# カテゴリごとにループ
+with metrics.span("questions"):
+    for category, q_list in site_content.questions.items():
+        st.markdown(f'<div class="category-header">{category}</div>', unsafe_allow_html=True)
+        
+        render_category(category, q_list)
+
+# カテゴリ平均 (8問の合計 / 8)
+user_scores = answer_state.category_means()
 
 st.markdown("---")
 
+# --- 回答の保存 (追記専用のレスポンスストア) ---
+# 保存先は環境変数 LIFE_MAPPING_STORE で変更できる (空文字なら保存しない)
+RESPONSE_STORE_PATH = os.environ.get(
+    "LIFE_MAPPING_STORE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "responses.lmrs")
+)
+
+# ?cohort= は URL からそのまま来るので、LIFE_MAPPING_COHORTS (カンマ区切り) に設定したタグだけ受け付ける
+COHORTS = frozenset(filter(None, (tag.strip() for tag in os.environ.get("LIFE_MAPPING_COHORTS", "").split(","))))
+
+def cohort_tag():
+    """?cohort= のタグ (設定されていないタグは空文字 = タグなし)"""
+    tag = st.query_params.get("cohort", "")
+    return tag if tag in COHORTS else ""
+
+@st.cache_resource
+def get_response_store():
+    # numpy を読み込むので、最初の保存時まで import を遅らせる
+    from response_store import ResponseStore
+    return ResponseStore(RESPONSE_STORE_PATH)
+
+def save_submission(archetype_id, cohort=""):
+    """回答とアーキタイプを保存 (同じ回答でボタンを押し直しても二重に保存しない)"""
+    if not RESPONSE_STORE_PATH:
+        return
+    answers = bytes(answer_state.answers)
+    if st.session_state.get("saved_submission") == (answers, cohort):
+        return
+    get_response_store().append(list(answers), archetype_id, cohort=cohort)
+    st.session_state["saved_submission"] = (answers, cohort)
+
+# --- 母集団パーセンタイル (全セッション・全プロセスで共有するヒストグラム) ---
+# 保存先は環境変数 LIFE_MAPPING_POPULATION で変更できる (空文字なら表示しない)
+POPULATION_STATS_PATH = os.environ.get(
+    "LIFE_MAPPING_POPULATION", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "population.hist")
+)
+
+@st.cache_resource
+def get_population_stats():
+    from population_stats import PopulationStats
+    return PopulationStats(POPULATION_STATS_PATH)
+
+def count_population():
+    """今回の回答を母集団に加え (同じ回答は一度だけ)、カテゴリごとの上位何%を返す"""
+    if not POPULATION_STATS_PATH:
+        return None
+    stats = get_population_stats()
+    answers = bytes(answer_state.answers)
+    sums = list(answer_state.sums)
+    if st.session_state.get("counted_submission") != answers:
+        stats.add(sums)
+        st.session_state["counted_submission"] = answers
+    return stats.top_percents(sums)
+
 # ▼ 【下部】お名前入力欄 (Bottom) - 上部と同期
 st.text_input(
     "お名前 (上部で未入力の場合はこちらへ)", 
@@ -157,91 +344,55 @@ st.text_input(
     placeholder="例: 山田 太郎"
 )
 
-if st.button("診断結果を表示する"):
+submitted = st.button("診断結果を表示する")
+restored = st.session_state.pop("restore_result", False) and bool(st.session_state["shared_name"])
+if submitted or restored:
     # 名前チェックは共有変数を見る
     if not st.session_state["shared_name"]:
         st.error("お名前を入力してください。")
     else:
         name = st.session_state["shared_name"]
+        if restored:
+            # 再接続で表示し直すだけなので、母集団・レスポンスストアには数え直さない
+            answers = bytes(answer_state.answers)
+            st.session_state["counted_submission"] = answers
+            st.session_state["saved_submission"] = (answers, cohort_tag())
         
-        # ▼ 【重要】 戻り値に「question」を追加して受け取る
-        archetype_name, description, icon, question = calculate_archetype(user_scores)
+        # 母集団の中での位置 (上位何%か)
+        percentiles = count_population()
         
-        st.balloons()
-        
-        st.success(f"診断完了！ {name} さんの現在地が見つかりました。")
-        col1, col2 = st.columns([1, 1.2])
+        # ?chart=svg で Plotly を使わない軽量な静的SVGチャートに切り替え
+        archetype_id = render_result(
+            name, user_scores, chart=st.query_params.get("chart", "plotly"), percentiles=percentiles, content=site_content,
+            celebrate=submitted,
+        )
+        st.session_state["shown_result"] = bytes(answer_state.answers)
         
-        with col1:
-            # レーダーチャート
-            categories = list(user_scores.keys())
-            values = list(user_scores.values())
-            fig = go.Figure()
-            fig.add_trace(go.Scatterpolar(
-                r=values, theta=categories, fill='toself', name=name,
-                line_color='#1E3A8A', fillcolor='rgba(30, 58, 138, 0.2)'
-            ))
-            fig.update_layout(polar=dict(radialaxis=dict(visible=True, range=[0, 5])), showlegend=False, margin=dict(l=40, r=40, t=30, b=30))
-            st.plotly_chart(fig, use_container_width=True)
-
-        with col2:
-            st.markdown(f"### {icon} {archetype_name}")
-            
-            # 説明文（既存）
-            st.info(description)
-            
-            # ▼ 【重要】 「あなたへの問い」のデザインを変更（改行・太字・サイズ調整）
-            st.markdown(f"""
-            <div style="background-color: #fff7ed; border-left: 5px solid #f97316; padding: 15px; border-radius: 5px; margin-top: 10px; margin-bottom: 20px; color: #431407;">
-                <span style="font-size: 0.9rem; color: #c2410c;">🤔 あなたへの問い</span>
-                <div style="margin-top: 10px; font-weight: bold; font-size: 1.1rem; line-height: 1.5;">
-                    {question}
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            st.markdown("#### Life Elements Analysis")
-            
-            # 各要素の詳細レポート表示
-            for cat, score in user_scores.items():
-                # H/M/L 判定
-                if score >= 4.0:
-                    level, level_color = "H", "tag-blue"
-                    bar_color = "blue"
-                elif score >= 2.5:
-                    level, level_color = "M", "tag-green"
-                    bar_color = "green"
-                else:
-                    level, level_color = "L", "tag-red"
-                    bar_color = "red"
-                
-                # 文章の取得
-                tag_text, feedback_text = definitions[cat][level]
-                
-                # スコアバー表示
-                bar_bg = f"background-color: {'#dbeafe' if bar_color=='blue' else '#dcfce7' if bar_color=='green' else '#fee2e2'};"
-                st.markdown(f"""
-                    <div style="margin-top: 10px; margin-bottom: 2px;">
-                        <span style="font-weight:bold;">{cat}: {score:.1f}</span> 
-                        <span class="{level_color}">{tag_text}</span>
-                    </div>
-                    <div style="width: 100%; background-color: #f3f4f6; border-radius: 5px; height: 8px;">
-                        <div style="width: {score/5*100}%; {bar_bg} height: 8px; border-radius: 5px;"></div>
-                    </div>
-                    """, unsafe_allow_html=True)
-                
-                # フィードバック文章
-                with st.expander(f"▼ {cat}のアドバイスを読む"):
-                    st.markdown(f'<div class="feedback-box">{feedback_text}</div>', unsafe_allow_html=True)
-
-        # Noteへの誘導
-        st.markdown("---")
-        st.markdown("### 🎁 Next Step")
-        st.markdown(f"""
-        **{archetype_name}** のあなたへ。
+        # どの回答が変わると結果が変わるか (カテゴリ合計の候補をまとめて判定、数ms)
+        from sensitivity import analyze
+        render_sensitivity(analyze(answer_state.answers, pairs=True), site_content)
         
-        この診断結果はあくまで「現在地」です。
-        この診断結果をもとに、より詳細な地図を描いてみませんか？
+        # この結果の共有リンク (どのサーバーでも開ける)
+        share_url = f"{st.context.url or ''}?r={permalink.encode(answer_state, name)}"
+        st.markdown("🔗 この結果の共有リンク")
+        st.code(share_url, language=None)
         
-        **👉 [Life Mapping Coaching (note)](https://note.com/toyamanchu1986/n/nd31342d61419)**
-        """)
\ No newline at end of file
+        if submitted:
+            metrics.inc("life_mapping_submissions_total")
+            metrics.inc("life_mapping_archetype_total", archetype=archetype_id)
+            
+            # 回答を保存 (?cohort=タグ でコホート別に集計できる)
+            save_submission(archetype_id, cohort=cohort_tag())
+            st.query_params["done"] = "1"
+
+if perf_mode:
+    record_rerun("full", _run_started)
+
+metrics.observe("life_mapping_stage_seconds", time.perf_counter() - _run_started, stage="run")
+metrics.inc("life_mapping_reruns_total", kind="full")
+touch_session()
+if METRICS_FILE:
+    metrics.maybe_write_textfile(METRICS_FILE)
+
+# 最初の実行の import 時間 (冷えた状態) と実行時間をログに出す (プロセスごとに1回だけ)
+report_first_render(_run_started - _imports_started, time.perf_counter() - _run_started)
@@ -0,0 +1,309 @@
+# archetype_rules.py
+
+import collections
+import itertools
+import math
+import sys
+import time
+
+# ルール表とスコア配列のレイアウトは archetype_table.py にある (ここから引いても使える)
+from archetype_table import (
+    CATEGORIES, CATEGORY_KEYS, CATEGORY_NAMES, DEFAULT, DERIVED, OPERATORS, RULES,
+    Pick, Rule, archetype_ids, referenced_categories, score_array,
+)
+
+
+class RuleError(ValueError):
+    pass
+
+
+# --- 1. コンパイル ---
+# 条件は「原子テスト」(特徴, ">=" か ">", しきい値) / (カテゴリ, "==", "min" か "max") とその真偽に正規化する。
+# "<" と "<=" は ">=" と ">" の否定なので、phi >= 4.0 と phi < 4.0 は同じテストを共有する。
+# ルールを優先度順に1本の条件列 (Clause) に展開し、未確定のテストで場合分けを繰り返して決定木を作る。
+# 分岐ごとに既知のテスト結果を持ち回り、既知の結果から決まるテスト (phi >= 4.0 が真なら phi >= 3.5 も真、
+# min >= 4.0 が偽で phi >= 4.0 が真…など区間で決まるもの) は評価せずに済ませる。
+Clause = collections.namedtuple("Clause", "literals archetype_id rule")
+Node = collections.namedtuple("Node", "test yes no")
+Leaf = collections.namedtuple("Leaf", "archetype_id rule")
+# steps: 評価したテストと結果 ((テストの式, 真偽), ...) / rule: 成立したルール (DEFAULT なら None)
+Trace = collections.namedtuple("Trace", "archetype_id rule steps")
+
+def _literal(condition):
+    feature, op, value = condition
+    if feature not in CATEGORY_KEYS and feature not in DERIVED:
+        raise RuleError(f"未知の特徴です: {condition}")
+    if op == "==":
+        if feature not in CATEGORY_KEYS or value not in ("min", "max"):
+            raise RuleError(f'"==" は (カテゴリ, "==", "min" / "max") の形だけ使えます: {condition}')
+        return (feature, op, value), True
+    if op not in OPERATORS or isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise RuleError(f"比較は {', '.join(OPERATORS)} と数値のしきい値で書いてください: {condition}")
+    return {
+        ">=": ((feature, ">=", value), True),
+        ">": ((feature, ">", value), True),
+        "<": ((feature, ">=", value), False),
+        "<=": ((feature, ">", value), False),
+    }[op]
+
+def expand(rules=RULES):
+    """ルール表を評価順の条件列 [Clause, ...] に展開する (Pick は同点の解決順に1カテゴリ1本)"""
+    priorities = [rule.priority for rule in rules]
+    if len(set(priorities)) != len(priorities):
+        raise RuleError(f"priority が重複しています: {sorted(p for p in set(priorities) if priorities.count(p) > 1)}")
+    clauses = []
+    for rule in sorted(rules, key=lambda r: r.priority):
+        literals = tuple(_literal(condition) for condition in rule.when)
+        if isinstance(rule.then, Pick):
+            if rule.then.extreme not in ("min", "max"):
+                raise RuleError(f"Pick の extreme は min / max です: {rule}")
+            for key, archetype_id in rule.then.order:
+                clauses.append(Clause(literals + (_literal((key, "==", rule.then.extreme)),), archetype_id, rule))
+        else:
+            clauses.append(Clause(literals, rule.then, rule))
+    return clauses
+
+def _bounds(feature, known):
+    """既知のテスト結果から feature の下限・上限を集める ([(a, 厳密か)], [(a, 厳密か)])
+
+    下限 (a, False) は feature >= a、(a, True) は feature > a。上限 (a, True) は feature < a、(a, False) は feature <= a。
+    カテゴリは min の下限・max の上限を、min は各カテゴリの上限を、max は各カテゴリの下限を引き継ぐ。
+    """
+    lower, upper = [], []
+    for (f, op, value), result in known.items():
+        if op == "==":
+            continue
+        inherit_lower = f == feature or (f == "min" and feature in CATEGORY_KEYS) or (feature == "max" and f in CATEGORY_KEYS)
+        inherit_upper = f == feature or (f == "max" and feature in CATEGORY_KEYS) or (feature == "min" and f in CATEGORY_KEYS)
+        if result and inherit_lower:
+            lower.append((value, op == ">"))
+        elif not result and inherit_upper:
+            upper.append((value, op == ">="))
+    return lower, upper
+
+def _decided(test, known):
+    """既知の結果から test の真偽が決まれば True / False、決まらなければ None"""
+    if test in known:
+        return known[test]
+    feature, op, value = test
+    if op == "==":
+        return None
+    lower, upper = _bounds(feature, known)
+    if op == ">=":
+        if any(a >= value for a, _ in lower):
+            return True
+        if any(a < value or (a == value and strict) for a, strict in upper):
+            return False
+    else:
+        if any(a > value or (a == value and strict) for a, strict in lower):
+            return True
+        if any(a <= value for a, _ in upper):
+            return False
+    return None
+
+def build_tree(clauses, default=DEFAULT, known=None):
+    """条件列から決定木を作る。同じテストは1つの経路で1回しか評価しない"""
+    known = known or {}
+    for i, clause in enumerate(clauses):
+        pending = None
+        for test, expected in clause.literals:
+            result = _decided(test, known)
+            if result is None:
+                pending = pending or test
+            elif result != expected:
+                break
+        else:
+            if pending is None:
+                return Leaf(clause.archetype_id, clause.rule)
+            rest = clauses[i:]  # ここより前の条件列は既知の結果だけで不成立 (結果が増えても不成立のまま)
+            return Node(
+                pending,
+                build_tree(rest, default, {**known, pending: True}),
+                build_tree(rest, default, {**known, pending: False}),
+            )
+    return Leaf(default, None)
+
+def _expression(test):
+    feature, op, value = test
+    left = DERIVED[feature][0] if feature in DERIVED else feature
+    right = DERIVED[value][0] if op == "==" else repr(value)
+    return f"{left} {op} {right}"
+
+def _needs(test):
+    feature, op, value = test
+    return [f for f in (feature, value if op == "==" else None) if f in DERIVED]
+
+def generate_source(tree, name="classify"):
+    """決定木を入れ子の if 文の Python ソースにする (引数 s はスコア配列)
+
+    どの葉も return するので、偽の枝は if の後ろに同じ深さで続ける。min / max / avg はその経路で最初に使う直前に計算する。
+    """
+    lines = [f"def {name}(s):", f"    {', '.join(CATEGORY_KEYS)} = s"]
+
+    def emit(node, depth, computed):
+        pad = "    " * depth
+        if isinstance(node, Leaf):
+            lines.append(f"{pad}return {node.archetype_id}")
+            return
+        for feature in _needs(node.test):
+            if feature not in computed:
+                variable, expression = DERIVED[feature]
+                lines.append(f"{pad}{variable} = {expression}")
+                computed = computed | {feature}
+        lines.append(f"{pad}if {_expression(node.test)}:")
+        emit(node.yes, depth + 1, computed)
+        emit(node.no, depth, computed)
+
+    emit(tree, 1, frozenset())
+    return "\n".join(lines) + "\n"
+
+def _count(tree):
+    if isinstance(tree, Leaf):
+        return 0, 1
+    nodes_yes, leaves_yes = _count(tree.yes)
+    nodes_no, leaves_no = _count(tree.no)
+    return 1 + nodes_yes + nodes_no, leaves_yes + leaves_no
+
+def _depth(tree):
+    return 0 if isinstance(tree, Leaf) else 1 + max(_depth(tree.yes), _depth(tree.no))
+
+
+class Engine:
+    """ルール表を1回だけコンパイルした判定器 (読み取り専用・プロセスで共有)
+
+    classify(s):  スコア配列 → アーキタイプID (生成した if 文の関数)
+    trace(s):     同じ判定を決定木をたどって行い、評価したテストと成立したルールを返す (説明・デバッグ用)
+    """
+
+    __slots__ = ("rules", "default", "tree", "source", "classify", "nodes", "leaves", "depth")
+
+    def __init__(self, rules=RULES, default=DEFAULT):
+        self.rules = tuple(rules)
+        self.default = default
+        self.tree = build_tree(expand(self.rules), default)
+        self.source = generate_source(self.tree)
+        namespace = {}
+        exec(compile(self.source, "<archetype_rules>", "exec"), namespace)
+        self.classify = namespace["classify"]
+        self.nodes, self.leaves = _count(self.tree)
+        self.depth = _depth(self.tree)
+
+    def trace(self, s):
+        values = dict(zip(CATEGORY_KEYS, s))
+        values.update({"min": min(s), "max": max(s), "avg": sum(s) / len(s)})
+        node, steps = self.tree, []
+        while isinstance(node, Node):
+            feature, op, value = node.test
+            right = values[value] if op == "==" else value
+            result = values[feature] >= right if op == ">=" else values[feature] > right if op == ">" else values[feature] == right
+            steps.append((f"{feature} {op} {value}", result))
+            node = node.yes if result else node.no
+        return Trace(node.archetype_id, node.rule, tuple(steps))
+
+
+ENGINE = Engine()
+classify = ENGINE.classify
+
+def classify_scores(scores):
+    """{カテゴリ名: 平均} (6カテゴリすべて) → アーキタイプID"""
+    return classify(score_array(scores))
+
+
+# --- 2. 差分検証 (旧 calculate_archetype との突き合わせ) ---
+def _check_points(points):
+    from archetypes import ARCHETYPE_IDS, calculate_archetype_cascade
+
+    mismatches = []
+    for sums in points:
+        s = tuple(v / 8 for v in sums)
+        expected = ARCHETYPE_IDS[calculate_archetype_cascade(dict(zip(CATEGORY_NAMES, s)))]
+        got = classify(s)
+        if got != expected:
+            mismatches.append((sums, got, expected))
+    return mismatches
+
+def _check_partial(points):
+    """カテゴリが欠けた入力 (合計が None の位置) で calculate_archetype を旧判定と突き合わせる"""
+    from archetypes import ARCHETYPE_IDS, calculate_archetype, calculate_archetype_cascade
+
+    mismatches = []
+    for sums in points:
+        scores = {name: v / 8 for name, v in zip(CATEGORY_NAMES, sums) if v is not None}
+        expected = ARCHETYPE_IDS[calculate_archetype_cascade(scores)]
+        got = ARCHETYPE_IDS[calculate_archetype(scores)]
+        if got != expected:
+            mismatches.append((sums, got, expected))
+    return mismatches
+
+def _check_prefix(prefix):
+    rest = range(8, 41)
+    return _check_points(prefix + tail for tail in itertools.product(rest, repeat=len(CATEGORIES) - len(prefix)))
+
+def boundary_sums(rules=RULES):
+    """ルール表のしきい値の両側にあたるカテゴリ合計 (と両端 8, 40)。この値の直積でどの比較も両方の結果をとる"""
+    values = {8, 40}
+    for rule in rules:
+        for feature, op, value in rule.when:
+            if isinstance(value, (int, float)) and feature != "avg":
+                # >= / < は ceil(v×8) を境に、> / <= は floor(v×8) を境に結果が変わる
+                edge = math.ceil(value * 8) if op in (">=", "<") else math.floor(value * 8) + 1
+                values.update({edge - 1, edge})
+    return tuple(sorted(v for v in values if 8 <= v <= 40))
+
+def verify(full=False, samples=200_000, workers=None, seed=0):
+    """コンパイルした判定器を旧 calculate_archetype と突き合わせ、不一致 [(合計, 新, 旧), ...] を返す
+
+    入力はカテゴリ合計 8〜40 (平均 = 合計 / 8) の離散空間。
+    full=False: しきい値の両側の値の直積 (同点も含む。約100万点) + 全空間からの無作為抽出
+    full=True : 33^6 ≒ 13億点すべて (プロセス並列。1コアあたり1〜2時間)
+    どちらも、カテゴリが欠けた入力 (欠け方 62 通り × しきい値の両側の値から抽出) も突き合わせる
+    """
+    import random
+
+    rng = random.Random(seed)
+    edges = boundary_sums()
+    partial = [
+        tuple(rng.choice(edges) if present else None for present in mask)
+        for mask in itertools.product((True, False), repeat=len(CATEGORIES)) if 0 < sum(mask) < len(CATEGORIES)
+        for _ in range(1000)
+    ]
+    mismatches = _check_partial(partial)
+    if not full:
+        points = list(itertools.product(edges, repeat=len(CATEGORIES)))
+        points += [tuple(rng.randint(8, 40) for _ in CATEGORIES) for _ in range(samples)]
+        return mismatches + _check_points(points)
+
+    from multiprocessing import Pool
+
+    prefixes = list(itertools.product(range(8, 41), repeat=2))
+    with Pool(workers) as pool:
+        for done, found in enumerate(pool.imap_unordered(_check_prefix, prefixes), 1):
+            mismatches.extend(found)
+            print(f"\r{done}/{len(prefixes)} blocks, {len(mismatches)} mismatches", end="", file=sys.stderr)
+    print(file=sys.stderr)
+    return mismatches
+
+
+if __name__ == "__main__":
+    # 使い方: python archetype_rules.py show | trace <平均6個をカンマ区切り> | verify [--full] [--workers N]
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "show":
+        print(ENGINE.source)
+        print(f"# {len(RULES)} rules -> {ENGINE.nodes} tests, {ENGINE.leaves} leaves, depth {ENGINE.depth}")
+    elif command == "trace" and len(sys.argv) > 2:
+        scores = tuple(float(v) for v in sys.argv[2].split(","))
+        result = ENGINE.trace(scores)
+        for test, value in result.steps:
+            print(f"  {test:<16} {value}")
+        rule = f"{result.rule.priority} {result.rule.name}" if result.rule else "DEFAULT"
+        print(f"-> Type {result.archetype_id} ({rule})")
+    elif command == "verify":
+        workers = int(sys.argv[sys.argv.index("--workers") + 1]) if "--workers" in sys.argv else None
+        started = time.perf_counter()
+        found = verify(full="--full" in sys.argv, workers=workers)
+        for sums, got, expected in found[:20]:
+            print(f"mismatch {sums}: engine={got} cascade={expected}")
+        print(("OK" if not found else f"{len(found)} mismatches") + f" ({time.perf_counter() - started:.1f}s)")
+        sys.exit(1 if found else 0)
+    else:
+        sys.exit("usage: python archetype_rules.py show | trace <scores> | verify [--full] [--workers N]")
@@ -0,0 +1,95 @@
+# archetype_table.py
+
+import collections
+import operator
+
+# 判定ルール表とスコア配列のレイアウト (コンパイルは archetype_rules.py)。
+# content の整合性チェックがルール表だけを見られるよう、決定木のコンパイルとは別のモジュールにしている
+
+# --- 1. スコア配列のレイアウト ---
+# 判定は6カテゴリの平均スコアをこの順に並べた配列 (tuple / list) で行う。略号はルール表の特徴名
+CATEGORIES = (
+    ("phi", "哲学 (Philosophy)"),
+    ("env", "環境 (Environment)"),
+    ("tal", "才能 (Talent)"),
+    ("des", "構想 (Vision)"),
+    ("vit", "健康 (Vitality)"),
+    ("con", "繋がり (Connection)"),
+)
+CATEGORY_KEYS = tuple(key for key, _ in CATEGORIES)
+CATEGORY_NAMES = tuple(name for _, name in CATEGORIES)
+# 配列から計算する特徴 → 生成コードでの変数名と式 (その特徴を最初に使う分岐の直前で1回だけ計算する)
+DERIVED = {
+    "min": ("lo", "min(s)"),
+    "max": ("hi", "max(s)"),
+    "avg": ("avg", "sum(s) / len(s)"),
+}
+OPERATORS = (">=", ">", "<=", "<", "==")
+
+_pick_scores = operator.itemgetter(*CATEGORY_NAMES)
+
+def score_array(scores):
+    """{カテゴリ名: 平均} → 判定用の配列 (6カテゴリ以外のキーは見ない。欠けていれば ValueError)"""
+    try:
+        return _pick_scores(scores)
+    except KeyError:
+        missing = [name for name in CATEGORY_NAMES if name not in scores]
+        raise ValueError(f"カテゴリのスコアがありません: {', '.join(missing)}") from None
+
+
+# --- 2. 判定ルール表 ---
+# priority の小さい順に評価し、when の条件がすべて成り立った最初のルールの then を返す (どれも成り立たなければ DEFAULT)。
+# 条件は (特徴, 比較, 値)。特徴はカテゴリ略号か min / max / avg、値は平均スコアのしきい値。
+# then が Pick なら、order の順 (同点の解決順) に見て最初に min / max と等しいカテゴリの ID を返す。
+# 該当するカテゴリが order に無ければ、そのルールは成り立たなかったものとして次へ進む。
+Rule = collections.namedtuple("Rule", "priority name when then")
+Pick = collections.namedtuple("Pick", "extreme order")
+
+RULES = (
+    # 統合された統治者 (All High)
+    Rule(10, "All High", (("min", ">=", 4.0),), 5),
+    # 低スコアが際立っている場合は最も低いカテゴリで決める (健康 → 繋がり → 哲学 → 環境)
+    Rule(20, "Critical Warning", (("min", "<=", 2.8),), Pick("min", (("vit", 1), ("con", 2), ("phi", 3), ("env", 4)))),
+    # Mastery & High Balance
+    Rule(30, "Mastery", (("phi", ">=", 4.0), ("con", ">=", 4.0), ("vit", ">=", 3.5)), 6),  # 覚醒した賢者
+    Rule(31, "Mastery", (("env", ">=", 4.0), ("des", ">=", 4.0), ("tal", ">=", 3.5)), 7),  # 偉大なる建設者
+    # Archetype Combinations (Specific Pairs)
+    Rule(40, "Combination", (("tal", ">=", 4.0), ("des", ">=", 4.0)), 8),   # 創業者
+    Rule(41, "Combination", (("con", ">=", 4.0), ("des", ">=", 4.0)), 9),   # リーダー
+    Rule(42, "Combination", (("phi", ">=", 4.0), ("tal", ">=", 4.0)), 10),  # 創造者
+    Rule(43, "Combination", (("des", ">=", 4.0), ("env", ">=", 3.5)), 11),  # プロデューサー
+    Rule(44, "Combination", (("con", ">=", 4.0), ("env", ">=", 3.5)), 12),  # 社会彫刻家
+    Rule(45, "Combination", (("env", ">=", 4.0), ("vit", ">=", 3.5)), 13),  # 統治代行者
+    Rule(46, "Combination", (("env", ">=", 4.0), ("con", ">=", 3.5)), 14),  # 愛される貴族
+    Rule(47, "Combination", (("phi", ">=", 4.0), ("vit", ">=", 4.0)), 15),  # 求道者
+    # Gap Types (High Potential but Missing something)
+    Rule(50, "Gap", (("tal", ">=", 4.0), ("env", "<=", 3.0)), 22),  # 猛虎
+    Rule(51, "Gap", (("tal", ">=", 3.5), ("des", "<=", 3.0)), 23),  # 航海士
+    # Specialists: 最も高いカテゴリで決める (哲学 → 環境 → 才能 → 構想 → 健康 → 繋がり)
+    Rule(60, "Specialist", (("max", ">=", 3.5),),
+         Pick("max", (("phi", 16), ("env", 17), ("tal", 18), ("des", 19), ("vit", 20), ("con", 21)))),
+    # Low Potential
+    Rule(70, "Low Potential", (("max", "<", 3.0),), 24),  # 白紙の冒険者
+    # Fallback: バランス型ならリーダーへ
+    Rule(80, "Fallback", (("avg", ">=", 3.0),), 9),
+)
+DEFAULT = 24  # それ以外は白紙
+
+
+def archetype_ids(rules=RULES, default=DEFAULT):
+    """ルール表が返しうるアーキタイプID"""
+    ids = {default}
+    for rule in rules:
+        if isinstance(rule.then, Pick):
+            ids.update(archetype_id for _, archetype_id in rule.then.order)
+        else:
+            ids.add(rule.then)
+    return frozenset(ids)
+
+def referenced_categories(rules=RULES):
+    """ルール表が参照するカテゴリ名 (派生特徴 min / max / avg は全カテゴリを見る)"""
+    features = {condition[0] for rule in rules for condition in rule.when}
+    features.update(key for rule in rules if isinstance(rule.then, Pick) for key, _ in rule.then.order)
+    if features & set(DERIVED):
+        return CATEGORY_NAMES
+    return tuple(name for key, name in CATEGORIES if key in features)
@@ -1,45 +1,33 @@
 # archetypes.py
 
+import content
+from archetype_rules import CATEGORY_NAMES, classify_scores
+
 # --- 1. アーキタイプ定義データ (Dictionary) ---
 # IDをキーにして、(名前, 説明, アイコン, 問い) を管理
-ARCHETYPE_DATA = {
-    # Warning / Critical Types (1-4)
-    1: ("Type 1: 傷ついた戦士 (The Burnout Warrior)", "責任感と優しさゆえに、あなたは誰よりも戦い続けてきました。でも、もう十分です。今はその重い鎧を脱いで、戦場から離れてみませんか？ 傷を癒やすことは、弱さではなく、次に進むための勇気ある選択です。", "🤕", "もし「何もしないあなた」になったとしても、そばにいてくれる人は誰ですか？"),
-    2: ("Type 2: 孤独なる君主 (The Lonely Monarch)", "社会的な成功を手にし、多くの人から頼られる存在ですね。けれど、ふとした瞬間に冷たい風を感じることはありませんか？ 頂上で一人きりになる前に、利害関係のない、心から笑い合える仲間との時間を思い出してください。", "❄️", "鎧を脱いで、子供のように無邪気に笑い合えたのはいつが最後ですか？"),
-    3: ("Type 3: 魂なき成功者 (The Hollow Successor)", "傍目には輝かしい成功者ですが、あなたの心は「何かが違う」と囁いているかもしれません。外側の装備はもう完璧です。これからは、置き去りにしてきた「内なる声」を迎えに行く旅に出かけましょう。", "🕳️", "誰からの称賛も得られないとしても、それでもやりたいことは何ですか？"),
-    4: ("Type 4: 根無し草の夢想家 (The Groundless Dreamer)", "あなたの描く理想と哲学は、とても美しくて高潔です。その夢を現実に降ろしてくるために、少しだけ泥臭い作業を始めてみませんか？ 足場を固めることで、あなたの言葉はもっと多くの人に届くようになります。", "🌫️", "理想を語る心地よさを手放してまで、あなたが本当に形にしたいものは何ですか？"),
-    
-    # Mastery / Integrated (5-7)
-    5: ("Type 5: 統合された統治者 (The Integrated Sovereign)", "人生のあらゆる要素が調和し、あなたは自分の王国をしっかりと治めています。周囲を照らす太陽のような存在です。完璧に見える今だからこそ、あえて「隙」や「遊び」を作ることで、あなたの魅力はさらに深まるでしょう。", "👑", "今のバランスを維持すること以上に、あなたが次に「愛を注ぎたい領域」はどこですか？"),
-    6: ("Type 6: 覚醒した賢者 (The Enlightened Sage)", "精神的な成熟を迎え、本質的な豊かさを知っているあなた。その在り方は、多くの人の癒やしとなっています。その深い智慧を、今度は現実社会の具体的な痛みを癒やすために、そっと手渡していってください。", "🧙‍♂️", "あなたの智慧を必要としている人は、今どこで泣いていますか？"),
-    7: ("Type 7: 偉大なる建設者 (The Grand Builder)", "現実を変える力と環境を持ったあなたは、社会に大きな贈り物を残せる人です。その手で築き上げる建造物が、機能的であるだけでなく、関わる人々の心も温めるものであるよう、願いを込めて進んでください。", "🏰", "あなたが築き上げた城の中で、人々はどんな表情で笑っていますか？"),
-    
-    # Archetype Combinations (8-15)
-    8: ("Type 8: 先見の明を持つ創業者 (The Visionary Founder)", "才能と構想が共鳴し、新しい時代を切り拓くエネルギーに満ちています。あなたのビジョンには世界を変える力があります。走り続けるためにも、あなた自身の「心」と「体」の声を聞く時間を忘れないでくださいね。", "🚀", "あなたの挑戦のゴールテープの先で、一番最初に抱きしめたい人は誰ですか？"),
-    9: ("Type 9: 求心力あるリーダー (The Charismatic Leader)", "あなたの周りには自然と人が集まり、大きな渦が生まれます。皆の想いを背負って進むことができるリーダーです。期待に応えることも大切ですが、あなた自身の魂の純度を保つことが、結果として皆を幸せにします。", "🌞", "リーダーという肩書きを外したとき、あなたは何をして遊ぶのが好きですか？"),
-    10: ("Type 10: 哲学する創造者 (The Philosophical Creator)", "独自の美学から生まれる仕事は、唯一無二の光を放っています。その感性は宝物です。理解されるまでに時間がかかるかもしれませんが、どうかそのこだわりを捨てないで。あなたの作品に救われる人が必ずいます。", "🎨", "あなたの表現を、言葉の通じない相手にも届けるとしたら、どんな方法を使いますか？"),
-    11: ("Type 11: 戦略的プロデューサー (The Strategic Producer)", "夢を夢のままで終わらせず、現実的な形にする手腕は魔法のようです。効率よく進める力は素晴らしいですが、時には「無駄」や「寄り道」の中にこそ、人生の彩りが隠されていることも思い出してください。", "🎬", "損得勘定を抜きにして、心が「ワクワクするほう」を選べるとしたら？"),
-    12: ("Type 12: 社会彫刻家 (The Social Architect)", "人と人を繋ぎ、新しい文化を織りなすことができる人です。コミュニティの温かい核となれます。他者の関係性を整えることに心を砕く一方で、あなた自身が置き去りになってしまわないよう、ご自愛くださいね。", "🌉", "たくさんの人を繋いだあと、最後にあなた自身と繋がりたい相手は誰ですか？"),
-    13: ("Type 13: 実直な統治代行者 (The Practical Governor)", "組織やチームを支える、縁の下の力持ちであり、要となる存在です。あなたの安定感に多くの人が救われています。でも、誰かのサポート役だけでなく、たまにはあなた自身がスポットライトを浴びてもいいんですよ。", "🏛️", "誰の役にも立たなくていいとしたら、あなたはどんな物語の主人公になりたいですか？"),
-    14: ("Type 14: 愛される貴族 (The Beloved Aristocrat)", "恵まれた環境と愛される人柄で、あなたの周りにはいつも優雅な空気が流れています。その余裕は周囲へのギフトです。その恵みを当たり前と思わず、循環させていくことで、あなたの人生はより豊かになります。", "🌹", "もしすべての持ち物を手放したとしても、あなたの中に残る「輝き」は何ですか？"),
-    15: ("Type 15: ストイックな求道者 (The Stoic Seeker)", "自身の内面と肉体を探求し、真理を追い求める姿は、現代の修行者のようです。そのストイックさは美しいですが、得た気づきを独り占めせず、迷える人々にシェアすることで、探求の旅は完成に近づきます。", "🏔️", "厳しい探求の果てに見つけた光を、あなたは誰の手にそっと置きたいですか？"),
-    
-    # Specialists (16-21)
-    16: ("Type 16: 純真な伝道師 (The Pure Evangelist)", "強い信念と情熱を持っていますね。その想いは本物です。今はまだ手段が足りないかもしれませんが、焦らなくて大丈夫。一つずつ道具を揃えていけば、あなたの声は必ず遠くまで届くようになります。", "📖", "あなたの情熱を「形」にするために、今日から始められる小さな習慣は何ですか？"),
-    17: ("Type 17: 幸運な継承者 (The Fortunate Heir)", "あなたは選ばれて、その恵まれた場所にいます。それは偶然ではなく、あなたが活かすべき才能の一つです。罪悪感を持つ必要はありません。そのリソースを軽やかに使いこなし、あなただけの花を咲かせてください。", "💐", "与えられたものではなく、あなた自身の手で掴み取りたいものは何ですか？"),
-    18: ("Type 18: 超絶技巧の職人 (The Hyper-Artisan)", "誰にも真似できない圧倒的な技術を持っています。その腕は職人の誇りです。ただ、一人で工房にこもるのではなく、あなたの技術を待っている人と手を取り合うことで、さらに素晴らしい景色が見えるはずです。", "💎", "あなたの技術が「最高であること」以上に、誰の「笑顔」のためにそれを使いたいですか？"),
-    19: ("Type 19: 孤高の策士 (The Grand Strategist)", "頭の中には完璧な地図がありますね。失敗を避ける慎重さは賢さの証ですが、人生の地図は歩きながら書き足していくものです。準備はもう十分。コンパスを頼りに、最初の一歩を踏み出してみませんか？", "🗺️", "もし「絶対に失敗しない」と保証されていたら、今すぐやりたいことは何ですか？"),
-    20: ("Type 20: 生命の化身 (The Vitality Avatar)", "底知れぬエネルギーの持ち主です。生きているだけで周りを元気づけるパワーがあります。その強大なエンジンを、怒りや焦りではなく、誰かを守り、愛することに使ったとき、奇跡が起きます。", "🔥", "その有り余るパワーを、たった一つのことに注ぐとしたら、何を選びますか？"),
-    21: ("Type 21: 天性のコネクター (The Universal Connector)", "あなたは人と人を繋ぐ架け橋です。そこから生まれる価値は計り知れません。ただ、誰かを繋いでいないときのあなた自身も、十分に価値があることを忘れないでくださいね。時には自分自身と繋がる時間を。", "🤝", "誰とも繋がっていない一人の時間、あなたは自分自身にどんな言葉をかけたいですか？"),
-    
-    # Gap & Potential (22-24)
-    22: ("Type 22: 檻の中の猛虎 (The Caged Tiger)", "本当はもっと高く飛べる翼があるのに、小さな檻の中で窮屈な思いをしていませんか？ あなたの牙はまだ錆びていません。誰かの許可を待つのはやめて、あなたにふさわしい広い空へ飛び立つ時です。", "🐅", "檻の鍵が開いているとしたら、あなたが外に出るのをためらわせている「恐れ」の正体は何ですか？"),
-    23: ("Type 23: 彷徨える航海士 (The Lost Navigator)", "航海の技術は持っていますが、どちらへ舵を切ればいいか迷っているようですね。目的地のない旅は疲れてしまいます。一度陸に上がり、焚き火を見つめながら、あなたの魂が震える方向を思い出しましょう。", "🧭", "人生の最期に「いい旅だった」と言えるために、今どうしても外せない目的地はどこですか？"),
-    24: ("Type 24: 白紙の冒険者 (The Blank Slate)", "今はまだ何者でもありません。でも、それは「何者にでもなれる」という最高の自由です。真っ白な地図を前にして、怖がる必要はありません。気の向くままに、最初の一筆を書き込む冒険を楽しんでください。", "🏳️", "何の制約もないとしたら、この真っ白な地図に最初に何を描きたいですか？")
-}
+# 文言は content/archetypes.json にある。ここはプロセス起動時点の内容で、判定ロジックはこれを返す。
+# 実行中の変更を反映したい画面は ID に直して content.current().archetypes を引く
+ARCHETYPE_DATA = content.current().archetypes
+
+# 逆引き: calculate_archetype の戻り値 → ID
+ARCHETYPE_IDS = {data: archetype_id for archetype_id, data in ARCHETYPE_DATA.items()}
 
 # --- 2. 判定ロジック (Archetype Logic) ---
+# 判定ルールは archetype_table.RULES の表にあり、archetype_rules が起動時に決定木へコンパイルする。
+# 6カテゴリちょうどの dict は決定木で判定し、カテゴリが欠けた・余分な dict は
+# 渡された値だけで min / max / 平均を取る旧判定 (calculate_archetype_cascade) に任せる
 def calculate_archetype(scores):
+    if len(scores) == len(CATEGORY_NAMES):
+        try:
+            return ARCHETYPE_DATA[classify_scores(scores)]
+        except ValueError:
+            pass
+    return calculate_archetype_cascade(scores)
+
+
+# --- 3. 旧判定ロジック (ルール表への移行前の if 連鎖) ---
+# 判定には使わない。archetype_rules の差分検証 (python archetype_rules.py verify) の基準としてだけ残す
+def calculate_archetype_cascade(scores):
     # スコアの展開
     phi = scores.get("哲学 (Philosophy)", 0)
     env = scores.get("環境 (Environment)", 0)
@@ -0,0 +1,127 @@
+# batch_scoring.py
+
+import math
+import sys
+import time
+
+import numpy as np
+
+from questions import questions_data
+import archetype_rules
+from archetypes import ARCHETYPE_DATA
+
+# --- 1. 回答行列のレイアウト ---
+# 列は questions_data のカテゴリ順 × 各カテゴリ8問 (N × 48)
+CATEGORY_ORDER = tuple(questions_data.keys())
+QUESTIONS_PER_CATEGORY = 8
+N_QUESTIONS = len(CATEGORY_ORDER) * QUESTIONS_PER_CATEGORY
+
+DEFAULT_CHUNK_ROWS = 100_000
+
+
+# --- 2. しきい値 (平均 → 合計への変換) ---
+# 平均は「合計 / 8」なので、合計の整数比較に置き換えると浮動小数の誤差が出ない
+def _sum_at_least(mean):
+    return math.ceil(mean * QUESTIONS_PER_CATEGORY)
+
+def _sum_at_most(mean):
+    return math.floor(mean * QUESTIONS_PER_CATEGORY)
+
+
+# --- 3. ベクトル化した判定ロジック ---
+def category_sums(answers):
+    """(N × 48) の回答行列からカテゴリ別合計 (N × 6) を計算"""
+    answers = np.asarray(answers)
+    if answers.ndim != 2 or answers.shape[1] != N_QUESTIONS:
+        raise ValueError(f"回答行列は (N × {N_QUESTIONS}) である必要があります: {answers.shape}")
+    if answers.size and (answers.min() < 1 or answers.max() > 5):
+        raise ValueError("回答は 1〜5 の整数である必要があります")
+    return answers.reshape(len(answers), len(CATEGORY_ORDER), QUESTIONS_PER_CATEGORY).sum(axis=2, dtype=np.int16)
+
+# ルール表を評価順の条件列に展開したもの (archetype_rules の決定木と同じ入力)
+RULE_CLAUSES = archetype_rules.expand()
+
+def _test_column(test, values):
+    """原子テスト1つを全行について評価する。しきい値 (平均) は合計の整数比較に直す"""
+    feature, op, value = test
+    if op == "==":
+        return values[feature] == values[value]
+    mean = value * len(CATEGORY_ORDER) if feature == "avg" else value  # avg は48問の総和と比べる
+    if op == ">=":
+        return values[feature] >= _sum_at_least(mean)
+    return values[feature] > _sum_at_most(mean)
+
+def classify_sums(sums):
+    """カテゴリ別合計 (N × 6) から アーキタイプID (N,) を判定
+
+    archetype_rules のルール表を評価順に並べ、np.select で「最初に成立した条件」を採用する。
+    同じテスト (phi >= 4.0 と phi < 4.0 など) は1回だけ計算し、使うすべてのルールで共有する。
+    """
+    s = np.asarray(sums)
+    values = {key: s[:, CATEGORY_ORDER.index(name)] for key, name in archetype_rules.CATEGORIES}
+    values.update({"min": s.min(axis=1), "max": s.max(axis=1), "avg": s.sum(axis=1)})
+
+    tests = {}
+    def literal(test, expected):
+        if test not in tests:
+            tests[test] = _test_column(test, values)
+        return tests[test] if expected else ~tests[test]
+
+    conditions = [
+        np.logical_and.reduce([literal(test, expected) for test, expected in clause.literals]) for clause in RULE_CLAUSES
+    ]
+    choices = [clause.archetype_id for clause in RULE_CLAUSES]
+    return np.select(conditions, choices, default=archetype_rules.DEFAULT).astype(np.uint8)
+
+def score_answers(answers):
+    """(N × 48) の回答行列を採点し、(カテゴリ平均 N × 6, アーキタイプID N) を返す"""
+    sums = category_sums(answers)
+    return sums / QUESTIONS_PER_CATEGORY, classify_sums(sums)
+
+
+# --- 4. CSV ストリーミング ---
+def iter_csv(path, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """CSV をチャンク単位で読み込み、(先頭の付帯列, カテゴリ平均, アーキタイプID) を順に返す
+
+    CSV はヘッダー付きで、末尾48列が回答 (カテゴリ順)。それより前の列 (ID・名前など) はそのまま引き継ぐ。
+    """
+    import pandas as pd
+
+    header = pd.read_csv(path, nrows=0).columns
+    if len(header) < N_QUESTIONS:
+        raise ValueError(f"CSV の列数が足りません ({len(header)} < {N_QUESTIONS})")
+    answer_columns = header[-N_QUESTIONS:]
+    dtypes = {c: np.int8 for c in answer_columns}
+
+    for chunk in pd.read_csv(path, dtype=dtypes, chunksize=chunk_rows):
+        answers = chunk[answer_columns].to_numpy()
+        means, ids = score_answers(answers)
+        yield chunk[header[:-N_QUESTIONS]], means, ids
+
+def score_csv(path, out_path, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """CSV を採点して結果 CSV を書き出す。処理した行数を返す"""
+    import pandas as pd
+
+    names = np.array([ARCHETYPE_DATA.get(i, ("",))[0] for i in range(max(ARCHETYPE_DATA) + 1)], dtype=object)
+    rows = 0
+    first = True
+    for extra, means, ids in iter_csv(path, chunk_rows):
+        out = extra.reset_index(drop=True)
+        for c, category in enumerate(CATEGORY_ORDER):
+            out[category] = means[:, c]
+        out["archetype_id"] = ids
+        out["archetype"] = names[ids]
+        out.to_csv(out_path, mode="w" if first else "a", header=first, index=False)
+        first = False
+        rows += len(out)
+    return rows
+
+
+if __name__ == "__main__":
+    # 使い方: python batch_scoring.py answers.csv scored.csv
+    if len(sys.argv) != 3:
+        sys.exit("usage: python batch_scoring.py <answers.csv> <scored.csv>")
+    start = time.perf_counter()
+    n = score_csv(sys.argv[1], sys.argv[2])
+    elapsed = time.perf_counter() - start
+    print(f"{n} rows in {elapsed:.2f}s ({n / max(elapsed, 1e-9):,.0f} rows/s)")
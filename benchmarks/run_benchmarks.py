@@ -0,0 +1,200 @@
+# benchmarks/run_benchmarks.py
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+
+from archetypes import calculate_archetype
+from batch_scoring import CATEGORY_ORDER, QUESTIONS_PER_CATEGORY, classify_sums
+
+APP_PATH = os.path.join(ROOT, "app.py")
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_TOLERANCE = 0.5  # ベースラインより 50% 以上悪化したら失敗
+
+
+# --- 1. 計測ユーティリティ ---
+def timed(fn, repeat=7, number=1):
+    """fn を number 回実行する計測を repeat 回行い、1回あたりの中央値 (秒) を返す"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - started) / number)
+    return statistics.median(samples)
+
+def rss_bytes():
+    """現在の常駐メモリ (Linux の /proc/self/statm から)"""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+# --- 2. 入力データ ---
+def representative_scores(n=2000, seed=0):
+    """実際の回答に近い入力: 1〜5 の一様な回答から作ったカテゴリ平均"""
+    rng = np.random.default_rng(seed)
+    sums = rng.integers(1, 6, size=(n, len(CATEGORY_ORDER), QUESTIONS_PER_CATEGORY)).sum(axis=2)
+    return [dict(zip(CATEGORY_ORDER, row / QUESTIONS_PER_CATEGORY)) for row in sums]
+
+def adversarial_scores(n=2000):
+    """判定の決定木の深い葉 (ルール表の後ろの方のルール) にたどり着く入力
+
+    しきい値付近の値の組み合わせから、Specialists 以降 (Type 16〜21, 24, フォールバックの 9) に
+    落ちるものだけを選ぶ。
+    """
+    values = np.array([23, 24, 25, 27, 28, 29])
+    grid = values[np.indices((len(values),) * len(CATEGORY_ORDER)).reshape(len(CATEGORY_ORDER), -1).T]
+    ids = classify_sums(grid)
+    late = grid[np.isin(ids, [9, 16, 17, 18, 19, 20, 21, 24])]
+    picked = late[np.linspace(0, len(late) - 1, n).astype(int)]
+    return [dict(zip(CATEGORY_ORDER, row / QUESTIONS_PER_CATEGORY)) for row in picked]
+
+
+# --- 3. ベンチマーク ---
+def bench_scoring(results):
+    for label, inputs in (("representative", representative_scores()), ("adversarial", adversarial_scores())):
+        per_call = timed(lambda: [calculate_archetype(s) for s in inputs]) / len(inputs)
+        results[f"calculate_archetype.{label}.latency_us"] = (per_call * 1e6, "us")
+        results[f"calculate_archetype.{label}.throughput"] = (1 / per_call, "calls/s")
+
+    from archetype_rules import classify, score_array
+    arrays = [score_array(s) for s in representative_scores()]
+    per_call = timed(lambda: [classify(a) for a in arrays]) / len(arrays)
+    results["archetype_rules.classify.latency_us"] = (per_call * 1e6, "us")
+
+    from batch_scoring import score_answers
+    answers = np.random.default_rng(1).integers(1, 6, size=(200_000, 48), dtype=np.int8)
+    results["batch_scoring.throughput"] = (len(answers) / timed(lambda: score_answers(answers), repeat=5), "rows/s")
+
+def bench_radar(results):
+    import plotly.io
+    import plotly.tools
+    from result_view import radar_figure, radar_svg
+
+    scores = representative_scores(1)[0]
+    categories, values = tuple(scores), tuple(scores.values())
+
+    def plotly_payload():
+        # st.plotly_chart と同じ処理 (検証付きで Figure 化 → JSON)
+        figure = plotly.tools.return_figure_from_figure_or_data(radar_figure(categories, values, "bench"), validate_figure=True)
+        return plotly.io.to_json(figure, validate=False)
+
+    results["radar.plotly.build_ms"] = (timed(plotly_payload, number=20) * 1000, "ms")
+    results["radar.plotly.payload_bytes"] = (len(plotly_payload().encode("utf-8")), "bytes")
+    results["radar.svg.build_ms"] = (timed(lambda: radar_svg.__wrapped__(categories, values), number=200) * 1000, "ms")
+
+def _questionnaire(app_test_cls):
+    at = app_test_cls.from_file(APP_PATH, default_timeout=120)
+    at.run()
+    return at
+
+def _result(at):
+    at.text_input(key="name_top").input("bench").run()
+    at.button[0].click().run()
+    return at
+
+def bench_app(results, sessions=10):
+    from streamlit.testing.v1 import AppTest
+
+    # 結果の保存先を一時ファイルに逃がす (ベンチマークで本番データを汚さない)
+    import tempfile
+    tmp = tempfile.mkdtemp(prefix="life-mapping-bench-")
+    os.environ["LIFE_MAPPING_STORE"] = os.path.join(tmp, "responses.lmrs")
+    os.environ["LIFE_MAPPING_POPULATION"] = os.path.join(tmp, "population.hist")
+
+    _result(_questionnaire(AppTest))  # ウォームアップ (import・キャッシュ)
+    results["app.questionnaire.run_ms"] = (timed(lambda: _questionnaire(AppTest), repeat=5) * 1000, "ms")
+
+    def result_rerun():
+        at = _questionnaire(AppTest)
+        at.text_input(key="name_top").input("bench").run()
+        started = time.perf_counter()
+        at.button[0].click().run()
+        return time.perf_counter() - started
+    results["app.result.run_ms"] = (statistics.median(result_rerun() for _ in range(5)) * 1000, "ms")
+
+    gc.collect()
+    before = rss_bytes()
+    alive = [_result(_questionnaire(AppTest)) for _ in range(sessions)]
+    gc.collect()
+    results["app.session.rss_bytes"] = ((rss_bytes() - before) / len(alive), "bytes")
+
+
+BENCHMARKS = {"scoring": bench_scoring, "radar": bench_radar, "app": bench_app}
+
+# 値が大きいほど良い指標 (それ以外は小さいほど良い)
+HIGHER_IS_BETTER = ("throughput",)
+
+
+# --- 4. ベースラインとの比較 ---
+def compare(results, baseline, tolerance):
+    """ベースラインより tolerance 以上悪化した指標の一覧 [(名前, 今回, ベースライン), ...]"""
+    regressions = []
+    for name, (value, _) in results.items():
+        if name not in baseline:
+            continue
+        base = baseline[name]["value"]
+        if any(key in name for key in HIGHER_IS_BETTER):
+            worse = value < base * (1 - tolerance)
+        else:
+            worse = value > base * (1 + tolerance)
+        if worse:
+            regressions.append((name, value, base))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Life Mapping ベンチマーク")
+    parser.add_argument("--only", choices=sorted(BENCHMARKS), action="append", help="実行するグループ (複数指定可)")
+    parser.add_argument("--json", help="結果の JSON を書き出すパス")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="比較するベースライン JSON")
+    parser.add_argument("--save-baseline", action="store_true", help="今回の結果をベースラインとして保存")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="許容する悪化率 (0.5 = 50%%)")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for group in args.only or BENCHMARKS:
+        BENCHMARKS[group](results)
+
+    report = {
+        "environment": {"python": platform.python_version(), "machine": platform.machine(), "cpus": os.cpu_count()},
+        "results": {name: {"value": value, "unit": unit} for name, (value, unit) in results.items()},
+    }
+    for name, (value, unit) in results.items():
+        print(f"{name:<45} {value:>14,.2f} {unit}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"baseline saved: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"baseline not found: {args.baseline} (--save-baseline で作成)")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    regressions = compare(results, baseline, args.tolerance)
+    for name, value, base in regressions:
+        print(f"REGRESSION {name}: {value:,.2f} (baseline {base:,.2f})", file=sys.stderr)
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed beyond {args.tolerance:.0%}", file=sys.stderr)
+        return 1
+    print("no regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+# bulk_reports.py
+
+import argparse
+import collections
+import html
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from batch_scoring import CATEGORY_ORDER, iter_csv
+from content import current as current_content
+
+DEFAULT_CHUNK_ROWS = 2048  # CSV を読む単位
+DEFAULT_JOB_ROWS = 256     # ワーカー1回分の人数
+
+# --- 1. レポートのHTML ---
+# アプリの CSS のうち結果パネルで使うものだけ (外部ファイル・ネットワークに依存しない単体のHTML)
+REPORT_CSS = """
+body {font-family: sans-serif; color: #1f2937; max-width: 880px; margin: 2rem auto; padding: 0 1rem;}
+h1 {color: #1E3A8A; font-size: 1.6rem;}
+h2 {color: #1E3A8A; border-bottom: 2px solid #1E3A8A; padding-bottom: 5px;}
+.description {background-color: #eff6ff; padding: 15px; border-radius: 5px; color: #1e3a8a;}
+.feedback-box {background-color: #f8fafc; border-left: 5px solid #1E3A8A; padding: 15px; border-radius: 5px; margin-top: 10px; margin-bottom: 20px; color: #334155;}
+.tag-blue {color: #1d4ed8; font-weight: bold;}
+.tag-green {color: #15803d; font-weight: bold;}
+.tag-red {color: #b91c1c; font-weight: bold;}
+table {border-collapse: collapse; width: 100%;}
+td, th {border-bottom: 1px solid #e5e7eb; padding: 6px; text-align: left;}
+"""
+
+def report_html(name, means, archetype_id, content):
+    """1人分のレポート (レーダーチャートSVG・アーキタイプ・6要素のフィードバック)"""
+    from result_view import feedback_block, question_html, radar_svg, score_bar_html
+    from feedback import score_level
+
+    archetype_name, description, icon, question = content.archetypes[archetype_id]
+    sections = []
+    for category, score in zip(CATEGORY_ORDER, means):
+        _, feedback = feedback_block(category, score_level(score), content)
+        sections.append(score_bar_html(category, score, content=content) + feedback)
+    title = html.escape(f"{name} さんの診断結果" if name else "診断結果")
+    return f"""<!DOCTYPE html>
+<html lang="ja"><head><meta charset="utf-8"><title>{title}</title><style>{REPORT_CSS}</style></head>
+<body>
+<h1>Life Mapping Diagnosis — {title}</h1>
+{radar_svg(CATEGORY_ORDER, tuple(means))}
+<h2>{icon} {archetype_name}</h2>
+<p class="description">{description}</p>
+{question_html(question)}
+<h2>Life Elements Analysis</h2>
+{"".join(sections)}
+</body></html>
+"""
+
+def render_job(out_dir, start, names, means, ids):
+    """ワーカー: start 番から連番でレポートを書き出し、索引用の (ファイル名, 名前, アーキタイプ名) を返す"""
+    content = current_content()
+    written = []
+    for n, (name, row, archetype_id) in enumerate(zip(names, means, ids), start):
+        filename = f"{n:06d}.html"
+        with open(os.path.join(out_dir, filename), "w", encoding="utf-8") as f:
+            f.write(report_html(name, row, archetype_id, content))
+        written.append((filename, name, content.archetypes[archetype_id][0]))
+    return written
+
+def index_html(entries):
+    rows = "".join(
+        f'<tr><td><a href="{filename}">{html.escape(name) or filename}</a></td><td>{archetype_name}</td></tr>'
+        for filename, name, archetype_name in entries
+    )
+    return f"""<!DOCTYPE html>
+<html lang="ja"><head><meta charset="utf-8"><title>Life Mapping reports</title><style>{REPORT_CSS}</style></head>
+<body><h1>Life Mapping reports ({len(entries)})</h1>
+<table><tr><th>名前</th><th>アーキタイプ</th></tr>{rows}</table>
+</body></html>
+"""
+
+
+# --- 2. 入力の分割 ---
+def iter_jobs(path, name_column=None, chunk_rows=DEFAULT_CHUNK_ROWS, job_rows=DEFAULT_JOB_ROWS):
+    """CSV をチャンクで読みながら採点し、(開始番号, 名前, カテゴリ平均, アーキタイプID) を job_rows 人ずつ返す"""
+    start = 0
+    for extra, means, ids in iter_csv(path, chunk_rows):
+        if name_column is None:
+            names = [""] * len(ids)
+        elif name_column in extra.columns:
+            names = extra[name_column].fillna("").astype(str).tolist()
+        else:
+            raise ValueError(f"CSV に {name_column!r} 列がありません")
+        means, ids = means.tolist(), ids.tolist()
+        for i in range(0, len(ids), job_rows):
+            yield start + i, names[i:i + job_rows], means[i:i + job_rows], ids[i:i + job_rows]
+        start += len(ids)
+
+
+# --- 3. パイプライン ---
+def generate_reports(path, out_dir, name_column=None, workers=None, job_rows=DEFAULT_JOB_ROWS, progress=sys.stderr):
+    """CSV の全員分のレポートと index.html を out_dir に書き出し、人数を返す
+
+    読み込み・採点はメインプロセスでチャンクごとにまとめて行い、HTML生成と書き出しをプロセスプールに配る。
+    処理中のジョブはワーカー数の2倍までに抑えるので、入力の大きさに関係なくメモリは一定。
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    entries = []
+    started = time.perf_counter()
+
+    def collect(future):
+        entries.extend(future.result())
+        if progress is not None:
+            elapsed = time.perf_counter() - started
+            print(f"\r{len(entries):,} reports  {len(entries) / max(elapsed, 1e-9):,.0f}/s", end="", file=progress, flush=True)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = collections.deque()
+        for job in iter_jobs(path, name_column, job_rows=job_rows):
+            if len(in_flight) >= 2 * workers:
+                collect(in_flight.popleft())
+            in_flight.append(pool.submit(render_job, out_dir, *job))
+        while in_flight:
+            collect(in_flight.popleft())
+    if progress is not None:
+        print(file=progress)
+
+    with open(os.path.join(out_dir, "index.html"), "w", encoding="utf-8") as f:
+        f.write(index_html(entries))
+    return len(entries)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CSV の回答から1人1枚の静的HTMLレポートを一括生成する")
+    parser.add_argument("csv", help="回答 CSV (ヘッダー付き・末尾48列が回答)")
+    parser.add_argument("out_dir", help="レポートの出力先ディレクトリ")
+    parser.add_argument("--name-column", help="名前の列 (省略時は名前なし)")
+    parser.add_argument("--workers", type=int, help="ワーカープロセス数 (既定: CPU数)")
+    parser.add_argument("--job-rows", type=int, default=DEFAULT_JOB_ROWS, help="ワーカー1回分の人数")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    n = generate_reports(args.csv, args.out_dir, args.name_column, args.workers, args.job_rows)
+    elapsed = time.perf_counter() - start
+    print(f"{n} reports in {elapsed:.2f}s ({n / max(elapsed, 1e-9):,.0f} reports/s) -> {args.out_dir}")
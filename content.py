@@ -0,0 +1,228 @@
+# content.py
+
+import collections
+import json
+import os
+import sys
+import threading
+import time
+import types
+
+import archetype_table
+
+# --- 1. データファイル ---
+# 設問・フィードバック・アーキタイプの文言は content/*.json に置く (各ファイルに "version" を持つ)。
+# 置き場所は環境変数 LIFE_MAPPING_CONTENT_DIR で変更できる。
+CONTENT_DIR = os.environ.get(
+    "LIFE_MAPPING_CONTENT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "content")
+)
+FILES = ("questions.json", "feedback.json", "archetypes.json")
+CHECK_INTERVAL = 2.0  # ファイルの変更を確認する間隔 (秒)
+
+QUESTIONS_PER_CATEGORY = 8  # 判定のしきい値 (合計の整数比較) はこの問数が前提
+LEVELS = ("H", "M", "L")
+ARCHETYPE_FIELDS = ("name", "description", "icon", "question")
+
+
+class ContentError(ValueError):
+    pass
+
+
+class Content(collections.namedtuple(
+    "Content", "versions questions definitions archetypes categories"
+)):
+    """読み込んだ文言一式 (読み取り専用・全セッションで共有)
+
+    versions:      {ファイル名: version}
+    questions:     {カテゴリ: (設問, ...)}
+    definitions:   {カテゴリ: {H/M/L: (タグ, フィードバック文)}}
+    archetypes:    {ID: (名前, 説明, アイコン, 問い)}
+    categories:    カテゴリ名の並び
+
+    辞書はすべて MappingProxyType、文字列は intern 済み。再読み込みでは新しい Content を作って差し替えるので、
+    1回の再実行の中で current() を1回だけ呼べば、途中で文言が混ざることはない。
+    比較・ハッシュは同一性で行う (キャッシュのキーに使える)。
+    """
+
+    __slots__ = ()
+    __eq__ = object.__eq__
+    __ne__ = object.__ne__
+    __hash__ = object.__hash__
+
+
+# --- 2. 読み込み ---
+def _freeze(value):
+    if isinstance(value, dict):
+        return types.MappingProxyType({_freeze(k): _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, str):
+        return sys.intern(value)
+    return value
+
+def _read(directory, filename, key):
+    path = os.path.join(directory, filename)
+    try:
+        with open(path, encoding="utf-8") as f:
+            document = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ContentError(f"{path}: {e}")
+    if not isinstance(document, dict) or not isinstance(document.get(key), dict) or not isinstance(document.get("version"), int):
+        raise ContentError(f'{path}: {{"version": <int>, "{key}": {{...}}}} の形式である必要があります')
+    return document["version"], document[key]
+
+def _check_shapes(questions, definitions, archetypes):
+    """JSON の値の型を確認する (形が違うと以降の処理が TypeError などで落ちるので、先に ContentError にする)"""
+    problems = []
+    for category, items in questions.items():
+        if not isinstance(items, list):
+            problems.append(f"questions.json: {category} は設問の配列である必要があります")
+    for category, levels in definitions.items():
+        if not isinstance(levels, dict) or not all(isinstance(entry, list) for entry in levels.values()):
+            problems.append(f'feedback.json: {category} は {{"H": [タグ, 文], ...}} の形である必要があります')
+    for archetype_id, data in archetypes.items():
+        if not isinstance(data, dict):
+            problems.append(f"archetypes.json: {archetype_id} はオブジェクトである必要があります")
+    if problems:
+        raise ContentError("\n".join(problems))
+
+def load(directory=CONTENT_DIR):
+    """content/*.json を読み込んで Content を作る (判定ルールとの整合性も確認する)"""
+    questions_version, questions = _read(directory, "questions.json", "questions")
+    feedback_version, definitions = _read(directory, "feedback.json", "definitions")
+    archetypes_version, archetypes = _read(directory, "archetypes.json", "archetypes")
+    _check_shapes(questions, definitions, archetypes)
+
+    try:
+        archetypes = {
+            int(archetype_id): [data[field] for field in ARCHETYPE_FIELDS] for archetype_id, data in archetypes.items()
+        }
+    except (KeyError, TypeError, ValueError):
+        raise ContentError(f"archetypes.json: 各アーキタイプに {', '.join(ARCHETYPE_FIELDS)} が必要です")
+
+    categories = tuple(questions)
+    content = Content(
+        versions=_freeze({"questions.json": questions_version, "feedback.json": feedback_version, "archetypes.json": archetypes_version}),
+        questions=_freeze(questions),
+        definitions=_freeze(definitions),
+        archetypes=_freeze(archetypes),
+        categories=_freeze(list(categories)),
+    )
+    check_compatible(content)
+    return content
+
+
+# --- 3. 判定ルールとの整合性 ---
+def rule_requirements():
+    """判定ルール表から (参照するカテゴリ名, 返しうるアーキタイプID) を取り出す
+
+    ルール表 (archetype_table) だけを見るので、決定木のコンパイルは待たない。
+    content にも archetypes にも依存しないので、archetypes.py 自身の読み込み中にも使える。
+    """
+    return archetype_table.referenced_categories(), archetype_table.archetype_ids()
+
+def check_compatible(content, previous=None):
+    """文言が判定ルール (と、読み込み済みの Content) と構造的に一致するか確認する。合わなければ ContentError
+
+    - カテゴリは判定ルールが参照する6つと同じで、各 QUESTIONS_PER_CATEGORY 問
+    - フィードバックは全カテゴリに H/M/L の (タグ, 文)
+    - アーキタイプは判定ルールが返しうる全IDについて (名前, 説明, アイコン, 問い) がある
+    - previous があれば、カテゴリの並びと問数が同じ (進行中のセッションの回答位置が変わらない)
+    """
+    problems = []
+    rule_categories, rule_ids = rule_requirements()
+
+    if set(content.categories) != set(rule_categories):
+        problems.append(f"カテゴリが判定ルールと一致しません: {sorted(set(content.categories) ^ set(rule_categories))}")
+    for category, questions in content.questions.items():
+        if not isinstance(questions, tuple) or len(questions) != QUESTIONS_PER_CATEGORY or not all(isinstance(q, str) and q for q in questions):
+            problems.append(f"{category}: 設問は空でない文字列が {QUESTIONS_PER_CATEGORY} 個必要です")
+
+    for category in content.categories:
+        levels = content.definitions.get(category)
+        if levels is None:
+            problems.append(f"{category}: フィードバックがありません")
+            continue
+        if not isinstance(levels, types.MappingProxyType):
+            problems.append(f"{category}: フィードバックは H/M/L をキーにしたオブジェクトである必要があります")
+            continue
+        for level in LEVELS:
+            entry = levels.get(level)
+            if not (isinstance(entry, tuple) and len(entry) == 2 and all(isinstance(s, str) for s in entry)):
+                problems.append(f"{category}/{level}: フィードバックは (タグ, 文) の2要素が必要です")
+
+    missing = sorted(rule_ids - set(content.archetypes))
+    if missing:
+        problems.append(f"判定ルールが返すアーキタイプがありません: {missing}")
+    for archetype_id, data in content.archetypes.items():
+        if not isinstance(data, tuple) or not all(isinstance(s, str) for s in data):
+            problems.append(f"アーキタイプ {archetype_id}: 文字列である必要があります")
+
+    if previous is not None and (
+        previous.categories != content.categories
+        or any(len(previous.questions[c]) != len(content.questions.get(c, ())) for c in previous.categories)
+    ):
+        problems.append("カテゴリの並び・問数が読み込み済みの内容と違います (再起動が必要です)")
+
+    if problems:
+        raise ContentError("\n".join(problems))
+
+
+# --- 4. 共有と再読み込み ---
+_lock = threading.Lock()
+_current = None
+_stamp = None
+_checked_at = 0.0
+
+def _file_stamp(directory):
+    stamp = []
+    for filename in FILES:
+        try:
+            st = os.stat(os.path.join(directory, filename))
+            stamp.append((st.st_mtime_ns, st.st_size, st.st_ino))
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+def current(directory=CONTENT_DIR):
+    """現在の Content (プロセス内で共有)
+
+    CHECK_INTERVAL 秒ごとにファイルの更新を確認し、変わっていれば読み込み直して丸ごと差し替える。
+    新しい内容が読めない・整合しないときは警告を出して古い内容を使い続ける (最初の読み込みだけは例外を上げる)。
+    """
+    global _current, _stamp, _checked_at
+    now = time.monotonic()
+    if _current is not None and now - _checked_at < CHECK_INTERVAL:
+        return _current
+    with _lock:
+        if _current is not None and now - _checked_at < CHECK_INTERVAL:
+            return _current
+        _checked_at = now
+        stamp = _file_stamp(directory)
+        if stamp == _stamp:
+            return _current
+        if _current is None:
+            _current = load(directory)
+        else:
+            try:
+                content = load(directory)
+                check_compatible(content, _current)
+            except ContentError as e:
+                print(f"[content] reload skipped: {e}", file=sys.stderr)
+            except Exception as e:  # 想定外の形でも、動いているセッションには古い内容を返し続ける
+                print(f"[content] reload skipped: {type(e).__name__}: {e}", file=sys.stderr)
+            else:
+                _current = content
+                print(f"[content] reloaded: {dict(content.versions)}", file=sys.stderr)
+        _stamp = stamp
+        return _current
+
+
+if __name__ == "__main__":
+    # 使い方: python content.py [dir]  (読み込んで整合性を確認する)
+    try:
+        content = load(sys.argv[1] if len(sys.argv) > 1 else CONTENT_DIR)
+    except ContentError as e:
+        sys.exit(f"NG\n{e}")
+    print(f"OK {dict(content.versions)}: {len(content.categories)} categories, "
+          f"{sum(len(q) for q in content.questions.values())} questions, {len(content.archetypes)} archetypes")
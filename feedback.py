@@ -1,35 +1,17 @@
 # feedback.py
 
+import content
+
 # --- 詳細フィードバック文章 (Definitions) ---
-definitions = {
-    "哲学 (Philosophy)": {
-        "H": ("【確立】", "あなたは確かな「自分軸」を持っており、魂が喜ぶ選択を重ねてこられました。素晴らしいことです。一方で、その揺るがない信念が、時に周囲の人にとって「入り込みづらい壁」になっていないでしょうか？ あなたの正しさを少しだけ緩めたとき、世界はもっと優しく広がるかもしれません。"),
-        "M": ("【模索】", "今、新しい価値観に触れながら「本当の自分」を探している最中ですね。その迷いは成長の証です。ただ、正解を探そうとして思考が止まってしまっていませんか？ 迷ったときは、頭で考えるのをやめて、あなたの「心が温かくなる方」を選んでみてください。"),
-        "L": ("【不在】", "周囲の期待に応えようと、柔軟に合わせてきたあなたの優しさを感じます。でも、そのために自分の声を後回しにしすぎてはいませんか？ 誰かの人生を生きるのではなく、まずは1日5分だけ、あなた自身のために時間を使ってあげてください。")
-    },
-    "環境 (Environment)": {
-        "H": ("【調和】", "心安らぐ場所と、経済的な安心感。あなたは今、とても豊かな土台の上に立っています。今の心地よさを十分に味わいつつ、もし心のどこかに「まだ行ける」という小さな灯火があるなら、少しだけ冒険の旅に出てみるのも素敵ですよ。"),
-        "M": ("【均衡】", "日々の暮らしは守られており、その中でしっかりと役割を果たされていますね。一方で、「これで十分だ」と自分に言い聞かせて、小さな違和感に蓋をしていませんか？ あなたの感性が求めている「余白」や「遊び」を、生活の中に少し招き入れてみましょう。"),
-        "L": ("【疲弊】", "今の環境に適応しようと、人一倍頑張ってきましたね。その忍耐強さは本当に立派です。でも、もう十分に戦いました。これ以上自分を削る必要はありません。「逃げる」ことは「負け」ではなく、大切なあなた自身を守るための「愛ある選択」です。")
-    },
-    "才能 (Talent)": {
-        "H": ("【開花】", "あなたのギフト（才能）は、すでに誰かの笑顔を生み出しています。どうか自信を持ってください。ただ、今の「得意」に安住してしまうのはもったいないかもしれません。あなたの中には、まだ開けられていない才能の箱が眠っているはずですから。"),
-        "M": ("【原石】", "「これかもしれない」という手応えを感じ始めていますね。その芽を大切にしましょう。もし「もっとすごくならないと」と焦っているなら、肩の力を抜いて。誰かに褒められるためではなく、あなたが「つい夢中になってしまう時間」を増やすだけで十分です。"),
-        "L": ("【封印】", "慎重で謙虚なあなたは、まだ自分の輝きを過小評価しているようです。「私には何もない」と思っていませんか？ 実は、あなたが「当たり前にできていること」の中にこそ、最強の武器が隠されています。自分の良さを、もっと許してあげてください。")
-    },
-    "構想 (Vision)": {
-        "H": ("【鮮明】", "理想の未来がクリアに見えていますね。人生の脚本家はあなた自身です。そのワクワクする景色を大切にしてください。もし足元が少しおろそかになっていると感じたら、遠くを見つめる時間を少し減らし、今日の一歩を愛でる時間を作ってみましょう。"),
-        "M": ("【展望】", "「こうなったらいいな」という予感に胸を膨らませている状態ですね。その希望はとても大切です。その夢を「いつか」のままにせず、少しだけ解像度を上げてみませんか？ 具体的な「匂い」や「音」まで想像できたとき、現実は動き出します。"),
-        "L": ("【漂流】", "目の前のことに誠実に向き合い、今日を懸命に生きています。その実直さはあなたの強みです。ただ、もし「どこへ向かっているんだろう」という不安があるなら、一度立ち止まって星を見上げてみましょう。現在地を知ることは、決して時間の無駄ではありませんよ。")
-    },
-    "健康 (Vitality)": {
-        "H": ("【充実】", "生命力が溢れ、直感も冴え渡っていますね！ その高いエネルギーは、あなたの人生を切り拓く最高のギフトです。この万能感を楽しんでください。そして、走り続けるためにこそ、時にはあえてペースを落とし、羽を休める時間も自分にプレゼントしてあげましょう。"),
-        "M": ("【維持】", "自分のリズムを保ち、大きな波風なく過ごせています。セルフケアができている証拠です。ただ、「なんとなくダルい」という身体の声を「いつものこと」と流していませんか？ その小さなサインを丁寧に拾うことで、あなたのパフォーマンスはもっと安定します。"),
-        "L": ("【枯渇】", "気力だけで責任を果たしてきた、あなたの責任感の強さには頭が下がります。でも、身体は正直です。今は「頑張る」ことよりも「休む」ことが、あなたにとって一番大切な仕事です。泥のように眠ることを、どうか自分に許してあげてください。")
-    },
-    "繋がり (Connection)": {
-        "H": ("【愛】", "あなたは愛し愛される喜びに包まれ、温かい安心感の中にいます。それは何にも代えがたい宝物です。その安全基地があるあなたなら、もう少し外の世界へ冒険に出ても大丈夫。異なる価値観を持つ人々との出会いが、あなたの愛をさらに深くするでしょう。"),
-        "M": ("【協調】", "誰とでも円滑に関われるコミュニケーション能力をお持ちですね。素敵です。一方で、心の奥底にある「弱さ」を見せることに、少し怖さを感じていませんか？ 完璧でないあなたを見せたときこそ、本当の深い絆が結ばれるかもしれません。"),
-        "L": ("【孤独】", "誰にも依存せず、独りで立ち続ける強さを持っています。その自立心は誇るべきものです。でも、もし心が張り詰めているなら、ほんの少しだけ荷物を降ろしてみませんか？ 世界はあなたが思っているよりも、ずっと優しくて温かい場所ですよ。")
-    }
-}
\ No newline at end of file
+# 文言は content/feedback.json にある。ここはプロセス起動時点の内容 ({カテゴリ: {H/M/L: (タグ, 文)}})。
+# 実行中の変更を反映したい画面は content.current().definitions を使う
+definitions = content.current().definitions
+
+# --- H/M/L 判定 ---
+def score_level(score):
+    """カテゴリ平均 → definitions のキー (H/M/L)"""
+    if score >= 4.0:
+        return "H"
+    elif score >= 2.5:
+        return "M"
+    return "L"
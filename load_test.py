@@ -0,0 +1,326 @@
+# load_test.py
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PORT = 8598
+DEFAULT_LEVELS = (1, 2, 4, 8, 16, 32)
+DEFAULT_SLO_MS = 250.0   # 設問1問の再実行 p95 がこれを超えたら「破綻」とみなす
+KNEE_FACTOR = 3.0        # または同時接続1のときの p95 の何倍になったら破綻とみなすか
+RUN_TIMEOUT = 60.0
+
+
+# --- 1. 1人分の回答者 (ブラウザの代わりに WebSocket で Streamlit と話す) ---
+class Respondent:
+    """Streamlit のフロントエンドと同じ BackMsg を送り、48問の回答 → 名前入力 → 結果表示までを行う
+
+    再実行ごとに、送信してから script_finished を受け取るまでの時間を latencies[kind] に記録する。
+    kind: initial (最初の表示) / question (設問1問、そのカテゴリのフラグメントのみ) / name (名前入力) / result (結果ボタン)
+    """
+
+    def __init__(self, port, number, think_time, questions, query_string, rng):
+        self.url = f"ws://127.0.0.1:{port}/_stcore/stream"
+        self.name = f"loadtest-{number}"
+        self.think_time = think_time
+        self.questions = questions
+        self.query_string = query_string
+        self.rng = rng
+        self.widgets = {}       # ウィジェットの種類 → [(id, fragment_id), ...] (表示順)
+        self.states = {}        # id → WidgetState (送信済みの値)
+        self.latencies = {"initial": [], "question": [], "name": [], "result": []}
+
+    async def think(self):
+        if self.think_time > 0:
+            # 人の操作間隔は右に裾の長い分布になるので、平均 think_time の対数正規分布で待つ
+            await asyncio.sleep(self.rng.lognormvariate(0, 0.5) * self.think_time / 1.133)
+
+    async def rerun(self, ws, kind, fragment_id="", trigger=None):
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        msg = BackMsg()
+        rerun = msg.rerun_script
+        rerun.query_string = self.query_string
+        rerun.page_script_hash = ""
+        if fragment_id:
+            rerun.fragment_id = fragment_id
+        for state in self.states.values():
+            rerun.widget_states.widgets.append(state)
+        if trigger is not None:
+            rerun.widget_states.widgets.append(trigger)
+
+        started = time.perf_counter()
+        await ws.send(msg.SerializeToString())
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(await asyncio.wait_for(ws.recv(), RUN_TIMEOUT))
+            kind_of_msg = forward.WhichOneof("type")
+            if kind_of_msg == "delta":
+                self._collect_widget(forward.delta)
+            elif kind_of_msg == "script_finished":
+                if forward.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    raise RuntimeError("app.py failed to compile")
+                break
+        self.latencies[kind].append(time.perf_counter() - started)
+
+    def _collect_widget(self, delta):
+        if delta.WhichOneof("type") != "new_element":
+            return
+        element = delta.new_element
+        widget_type = element.WhichOneof("type")
+        if widget_type in ("slider", "text_input", "button"):
+            widget_id = getattr(element, widget_type).id
+            widgets = self.widgets.setdefault(widget_type, [])
+            if all(widget_id != w for w, _ in widgets):
+                widgets.append((widget_id, delta.fragment_id))
+
+    def _set(self, widget_id, **value):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        state = WidgetState(id=widget_id)
+        for field, v in value.items():
+            if isinstance(v, list):
+                getattr(state, field).data.extend(v)
+            else:
+                setattr(state, field, v)
+        self.states[widget_id] = state
+
+    async def run(self):
+        import websockets
+
+        async with websockets.connect(self.url, subprotocols=["streamlit"], max_size=None) as ws:
+            await self.answer(ws)
+
+    async def answer(self, ws):
+        """接続済みの ws で、最初の表示から結果表示までを1人分行う"""
+        await self.rerun(ws, "initial")
+
+        # 設問: スライダーを動かすと、そのカテゴリのフラグメントだけが再実行される
+        for widget_id, fragment_id in self.widgets["slider"][:self.questions]:
+            await self.think()
+            self._set(widget_id, string_array_value=[str(self.rng.randint(1, 5))])
+            await self.rerun(ws, "question", fragment_id)
+
+        # 名前 (上部の入力欄)
+        await self.think()
+        name_top = next(w for w, _ in self.widgets["text_input"] if w.endswith("name_top"))
+        self._set(name_top, string_value=self.name)
+        await self.rerun(ws, "name")
+
+        # 結果ボタン
+        await self.think()
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+        button_id, _ = self.widgets["button"][0]
+        await self.rerun(ws, "result", trigger=WidgetState(id=button_id, trigger_value=True))
+
+
+# --- 2. サーバープロセスの CPU・メモリ ---
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+def process_cpu_seconds(pid):
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS  # utime + stime
+
+def process_rss(pid):
+    with open(f"/proc/{pid}/statm") as f:
+        return int(f.read().split()[1]) * _PAGE_SIZE
+
+class ProcessSampler:
+    """計測中に対象プロセス (ワーカー) の CPU 使用率と最大 RSS を記録する"""
+
+    def __init__(self, pids, interval=0.25):
+        self.pids = pids
+        self.interval = interval
+
+    async def __aenter__(self):
+        self.started = time.perf_counter()
+        self.cpu_start = {pid: process_cpu_seconds(pid) for pid in self.pids}
+        self.peak_rss = {pid: process_rss(pid) for pid in self.pids}
+        self._task = asyncio.create_task(self._sample())
+        return self
+
+    async def _sample(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            for pid in self.pids:
+                self.peak_rss[pid] = max(self.peak_rss[pid], process_rss(pid))
+
+    async def __aexit__(self, *exc):
+        self._task.cancel()
+        elapsed = time.perf_counter() - self.started
+        self.result = {
+            pid: {
+                "cpu_percent": 100 * (process_cpu_seconds(pid) - self.cpu_start[pid]) / elapsed,
+                "peak_rss_mb": max(self.peak_rss[pid], process_rss(pid)) / 2**20,
+            }
+            for pid in self.pids
+        }
+
+
+# --- 3. 同時接続数を段階的に上げて計測 ---
+def percentiles(samples):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    def at(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+    return {"p50": at(0.50), "p95": at(0.95), "p99": at(0.99), "max": ordered[-1] * 1000, "n": len(ordered)}
+
+async def run_level(port, concurrency, pids, think_time, questions, query_string, seed):
+    respondents = [
+        Respondent(port, n, think_time, questions, query_string, random.Random(seed * 100_003 + n)) for n in range(concurrency)
+    ]
+    async with ProcessSampler(pids) as sampler:
+        started = time.perf_counter()
+        outcomes = await asyncio.gather(*(r.run() for r in respondents), return_exceptions=True)
+        elapsed = time.perf_counter() - started
+
+    errors = [repr(o) for o in outcomes if isinstance(o, BaseException)]
+    latencies = {kind: [x for r in respondents for x in r.latencies[kind]] for kind in respondents[0].latencies}
+    reruns = sum(len(v) for v in latencies.values())
+    return {
+        "concurrency": concurrency,
+        "elapsed_s": elapsed,
+        "reruns_per_s": reruns / elapsed,
+        "latency_ms": {kind: percentiles(samples) for kind, samples in latencies.items()},
+        "errors": len(errors),
+        "error_examples": errors[:3],
+        "workers": sampler.result,
+    }
+
+async def measure_session_memory(port, pid, sessions, questions, query_string, seed):
+    """回答を終えたセッションを sessions 個開いたままにして、ワーカーの RSS の増分を1セッションあたりで返す (bytes)
+
+    1人目は import やキャッシュの初期化を含むので、その後の RSS を起点にする。
+    """
+    import websockets
+
+    connections = []
+    try:
+        for n in range(sessions + 1):
+            respondent = Respondent(port, n, 0, questions, query_string, random.Random(seed * 100_003 + n))
+            ws = await websockets.connect(respondent.url, subprotocols=["streamlit"], max_size=None)
+            connections.append(ws)
+            await respondent.answer(ws)
+            if n == 0:
+                await asyncio.sleep(1)
+                before = process_rss(pid)
+        await asyncio.sleep(2)
+        return (process_rss(pid) - before) / sessions
+    finally:
+        for ws in connections:
+            await ws.close()
+
+def find_knee(levels, slo_ms=DEFAULT_SLO_MS, factor=KNEE_FACTOR):
+    """設問の再実行 p95 が SLO を超える、または同時接続1の factor 倍を超える最初の同時接続数 (なければ None)"""
+    baseline = None
+    for level in levels:
+        question = level["latency_ms"]["question"]
+        if question is None or level["errors"]:
+            return level["concurrency"]
+        baseline = baseline or question["p95"]
+        if question["p95"] > slo_ms or question["p95"] > factor * baseline:
+            return level["concurrency"]
+    return None
+
+
+# --- 4. サーバーの起動 (--launch) ---
+def launch_server(port, env=None, app_dir=APP_DIR):
+    """streamlit run app.py をヘッドレスで起動し、/_stcore/health が応答するまで待つ"""
+    import urllib.request
+
+    process = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", os.path.join(app_dir, "app.py"), "--server.port", str(port), "--server.headless", "true"],
+        cwd=app_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1) as response:
+                if response.status == 200:
+                    return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"streamlit did not become healthy on port {port}")
+
+def print_report(report):
+    print(f"{'conc':>5} {'reruns/s':>9} {'question p50/p95/p99 ms':>26} {'result p95':>11} {'err':>4}  workers (cpu%, peak RSS MB)")
+    for level in report["levels"]:
+        q = level["latency_ms"]["question"] or {"p50": 0, "p95": 0, "p99": 0}
+        r = level["latency_ms"]["result"] or {"p95": 0}
+        workers = ", ".join(f"{pid}: {w['cpu_percent']:.0f}% {w['peak_rss_mb']:.0f}MB" for pid, w in level["workers"].items())
+        print(f"{level['concurrency']:>5} {level['reruns_per_s']:>9.1f} {q['p50']:>8.1f} /{q['p95']:>7.1f} /{q['p99']:>7.1f} "
+              f"{r['p95']:>11.1f} {level['errors']:>4}  {workers}")
+    knee = report["knee"]
+    print(f"latency breaks down at concurrency {knee}" if knee else "no breakdown within the tested levels")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ローカルの Streamlit アプリに同時回答者の負荷をかける")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="対象の Streamlit のポート")
+    parser.add_argument("--launch", action="store_true", help="streamlit run app.py をこのポートで起動してから計測する")
+    parser.add_argument("--pid", type=int, action="append", help="CPU・メモリを計測するワーカーのPID (--launch なら自動)")
+    parser.add_argument("--levels", default=",".join(map(str, DEFAULT_LEVELS)), help="同時回答者数の段階 (カンマ区切り)")
+    parser.add_argument("--think", type=float, default=2.0, help="操作間の平均待ち時間 (秒)")
+    parser.add_argument("--questions", type=int, default=48, help="1人が回答する設問数")
+    parser.add_argument("--query", default="chart=svg", help="アプリに渡すクエリ文字列")
+    parser.add_argument("--slo", type=float, default=DEFAULT_SLO_MS, help="設問の再実行 p95 の上限 (ms)")
+    parser.add_argument("--json", help="結果の JSON を書き出すパス")
+    parser.add_argument("--session-memory", type=int, metavar="N",
+                        help="負荷の代わりに、回答済みのセッションを N 個開いたままにして1セッションあたりのメモリを測る")
+    parser.add_argument("--app-dir", default=APP_DIR, help="--launch で起動する app.py のディレクトリ (比較用の別チェックアウトなど)")
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.launch:
+        # 負荷試験の回答で本番データを汚さない。開いたままのセッションが退避されないようにする
+        env = dict(os.environ, LIFE_MAPPING_STORE="", LIFE_MAPPING_POPULATION="", LIFE_MAPPING_IDLE_TTL="0")
+        server = launch_server(args.port, env, args.app_dir)
+    pids = args.pid or ([server.pid] if server else [])
+    if args.session_memory:
+        if len(pids) != 1:
+            parser.error("--session-memory needs exactly one worker (--launch or a single --pid)")
+        try:
+            per_session = asyncio.run(
+                measure_session_memory(args.port, pids[0], args.session_memory, args.questions, args.query, 0)
+            )
+        finally:
+            if server is not None:
+                server.send_signal(signal.SIGTERM)
+                server.wait(timeout=30)
+        print(f"{per_session / 2**20:.3f} MB per session (RSS growth over {args.session_memory} open sessions)")
+        return 0
+    try:
+        levels = []
+        for n, concurrency in enumerate(int(x) for x in args.levels.split(",")):
+            level = asyncio.run(run_level(args.port, concurrency, pids, args.think, args.questions, args.query, n))
+            levels.append(level)
+            print(f"concurrency {concurrency}: done in {level['elapsed_s']:.1f}s", file=sys.stderr)
+            if level["errors"]:
+                print(f"  errors: {level['error_examples']}", file=sys.stderr)
+    finally:
+        if server is not None:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=30)
+
+    report = {"levels": levels, "knee": find_knee(levels, args.slo), "think_time_s": args.think, "questions": args.questions}
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+# metrics.py
+
+import bisect
+import os
+import threading
+import time
+
+# --- 1. 登録済みメトリクス ---
+# 名前 → (種類, 説明)
+METRICS = {
+    "life_mapping_stage_seconds": ("histogram", "Time spent in each stage of a script run"),
+    "life_mapping_reruns_total": ("counter", "Script runs by kind (full page or single-category fragment)"),
+    "life_mapping_submissions_total": ("counter", "Completed diagnoses (result view rendered)"),
+    "life_mapping_archetype_total": ("counter", "Completed diagnoses by archetype id"),
+    "life_mapping_active_sessions": ("gauge", "Sessions that ran the script within the last ACTIVE_SESSION_WINDOW seconds"),
+}
+
+# ヒストグラムのバケット上限 (秒)
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+ACTIVE_SESSION_WINDOW = 300
+PRUNE_INTERVAL = 30  # 古いセッションを _sessions から消す間隔 (秒)
+
+_lock = threading.Lock()
+_counters = {}    # (名前, ラベル) → 値
+_histograms = {}  # (名前, ラベル) → [バケットごとの件数..., 合計, 件数]
+_sessions = {}    # セッションID → 最後に実行した時刻
+_pruned_at = 0.0
+
+
+# --- 2. 記録 ---
+def inc(name, amount=1, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+def observe(name, value, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    i = bisect.bisect_left(BUCKETS, value)
+    with _lock:
+        h = _histograms.get(key)
+        if h is None:
+            h = _histograms[key] = [0] * (len(BUCKETS) + 2)
+        if i < len(BUCKETS):
+            h[i] += 1
+        h[-2] += value
+        h[-1] += 1
+
+class span:
+    """with span("stage"): ... の所要時間を life_mapping_stage_seconds に記録する"""
+
+    __slots__ = ("stage", "started")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe("life_mapping_stage_seconds", time.perf_counter() - self.started, stage=self.stage)
+
+def _prune_sessions(now):
+    """ACTIVE_SESSION_WINDOW より前に実行したきりのセッションを消す (_lock を持って呼ぶ)"""
+    global _pruned_at
+    _pruned_at = now
+    for session_id in [s for s, seen in _sessions.items() if now - seen > ACTIVE_SESSION_WINDOW]:
+        del _sessions[session_id]
+
+def touch_session(session_id):
+    """セッションの実行を記録 (アクティブセッション数の計算用)
+
+    出力 (render) が一度も呼ばれない構成でも増え続けないよう、PRUNE_INTERVAL ごとにここでも古いセッションを消す。
+    """
+    now = time.monotonic()
+    with _lock:
+        _sessions[session_id] = now
+        if now - _pruned_at > PRUNE_INTERVAL:
+            _prune_sessions(now)
+
+
+# --- 3. Prometheus テキスト形式での出力 ---
+def _labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+def render():
+    """Prometheus のテキスト形式 (exposition format 0.0.4) で全メトリクスを返す"""
+    now = time.monotonic()
+    with _lock:
+        _prune_sessions(now)
+        counters = sorted(_counters.items())
+        histograms = sorted((key, list(h)) for key, h in _histograms.items())
+        active_sessions = len(_sessions)
+
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind == "gauge":
+            lines.append(f"{name} {active_sessions}")
+        elif kind == "counter":
+            lines.extend(f"{name}{_labels(labels)} {value}" for (n, labels), value in counters if n == name)
+        else:
+            for (n, labels), h in histograms:
+                if n != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(BUCKETS, h):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_labels(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{name}_bucket{_labels(labels, [('le', '+Inf')])} {h[-1]}")
+                lines.append(f"{name}_sum{_labels(labels)} {h[-2]}")
+                lines.append(f"{name}_count{_labels(labels)} {h[-1]}")
+    return "\n".join(lines) + "\n"
+
+def write_textfile(path):
+    """node_exporter の textfile collector 向けにファイルへ書き出す (一時ファイル → rename で原子的に置き換え)"""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(render())
+    os.replace(tmp, path)
+
+def start_http_server(port, host="127.0.0.1"):
+    """GET /metrics を返すHTTPサーバーをデーモンスレッドで起動する (既定ではローカルからのみ)"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+_last_written = {}
+
+def maybe_write_textfile(path, interval=5.0):
+    """前回の書き出しから interval 秒以上経っていれば write_textfile する (毎回の再実行から呼んでよい)"""
+    now = time.monotonic()
+    with _lock:
+        if now - _last_written.get(path, -interval) < interval:
+            return False
+        _last_written[path] = now
+    write_textfile(path)
+    return True
@@ -0,0 +1,105 @@
+# permalink.py
+
+import base64
+import functools
+import hashlib
+import hmac
+import os
+import struct
+
+from answer_state import PACKED_BYTES, AnswerState
+from content import current as current_content
+
+# --- 1. トークンの形式 ---
+# [版 1B][名前の長さ 1B][回答 18B (1問3ビット)][名前 UTF-8][HMAC-SHA256 の先頭 10B] を base64url (パディングなし) にする。
+# 名前なしで 40 文字。どのプロセス・レプリカでも鍵さえ同じなら検証して結果を再現できる。
+VERSION = 1
+HEADER = struct.Struct("<BB")
+MAC_BYTES = 10
+MAX_NAME_BYTES = 60
+
+# 鍵は LIFE_MAPPING_PERMALINK_SECRET (レプリカ間で共有する)。未設定なら data/permalink.key を作って使う (単一ホスト向け)
+KEY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "permalink.key")
+# LIFE_MAPPING_REPLICAS が 2 以上なら、ホストごとの鍵では他のレプリカでリンクを検証できないので鍵ファイルを作らない
+REPLICAS = int(os.environ.get("LIFE_MAPPING_REPLICAS", "1"))
+
+
+class InvalidToken(ValueError):
+    pass
+
+
+class MissingSecret(RuntimeError):
+    pass
+
+
+@functools.lru_cache(maxsize=1)
+def secret_key():
+    secret = os.environ.get("LIFE_MAPPING_PERMALINK_SECRET")
+    if secret:
+        return secret.encode("utf-8")
+    if REPLICAS > 1:
+        raise MissingSecret(
+            f"LIFE_MAPPING_REPLICAS={REPLICAS} では全レプリカ共通の LIFE_MAPPING_PERMALINK_SECRET を設定してください"
+        )
+    os.makedirs(os.path.dirname(KEY_PATH), exist_ok=True)
+    if not os.path.exists(KEY_PATH):
+        # 一時ファイルに書いてから link する (同時に起動したプロセスのうち最初の1つの鍵が残る)
+        tmp = f"{KEY_PATH}.{os.getpid()}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(os.urandom(32))
+        try:
+            os.link(tmp, KEY_PATH)
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(tmp)
+    with open(KEY_PATH, "rb") as f:
+        return f.read()
+
+def _mac(body, key):
+    return hmac.new(key, body, hashlib.sha256).digest()[:MAC_BYTES]
+
+def _truncate_utf8(name, limit):
+    raw = name.encode("utf-8")[:limit]
+    return raw.decode("utf-8", errors="ignore").encode("utf-8")
+
+
+# --- 2. 作成と検証 ---
+def encode(state, name, key=None):
+    """AnswerState と名前 → URL に載せられるトークン"""
+    name_bytes = _truncate_utf8(name, MAX_NAME_BYTES)
+    body = HEADER.pack(VERSION, len(name_bytes)) + state.pack() + name_bytes
+    return base64.urlsafe_b64encode(body + _mac(body, key or secret_key())).rstrip(b"=").decode("ascii")
+
+def decode(token, key=None):
+    """トークン → (AnswerState, 名前)。改ざん・破損・未知の版は InvalidToken"""
+    try:
+        raw = base64.urlsafe_b64decode(token.encode("ascii") + b"=" * (-len(token) % 4))
+    except (ValueError, UnicodeError):
+        raise InvalidToken("トークンを読み取れません")
+    if len(raw) < HEADER.size + PACKED_BYTES + MAC_BYTES:
+        raise InvalidToken("トークンが短すぎます")
+    body, mac = raw[:-MAC_BYTES], raw[-MAC_BYTES:]
+    if not hmac.compare_digest(mac, _mac(body, key or secret_key())):
+        raise InvalidToken("トークンが改ざんされています")
+
+    version, name_length = HEADER.unpack_from(body)
+    if version != VERSION or len(body) != HEADER.size + PACKED_BYTES + name_length:
+        raise InvalidToken("対応していないトークンです")
+    answers = body[HEADER.size:HEADER.size + PACKED_BYTES]
+    name = body[HEADER.size + PACKED_BYTES:].decode("utf-8", errors="replace")
+    return AnswerState.unpack(answers), name
+
+
+# --- 3. 結果の再現 (トークンごとにキャッシュ) ---
+def load_result(token, chart="plotly"):
+    """トークン → (名前, ResultParts)。同じリンクが何度開かれても判定・HTML生成は1回だけ (文言の版ごと)"""
+    return _load_result(token, chart, current_content())
+
+@functools.lru_cache(maxsize=4096)
+def _load_result(token, chart, content):
+    from result_view import build_result
+
+    state, name = decode(token)
+    return name, build_result(name, state.category_means(), chart, content=content)
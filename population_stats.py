@@ -0,0 +1,104 @@
+# population_stats.py
+
+import fcntl
+import os
+import struct
+import sys
+
+import numpy as np
+
+from batch_scoring import CATEGORY_ORDER, QUESTIONS_PER_CATEGORY
+
+# --- 1. ファイル形式 ---
+# カテゴリ平均は「合計 / 8」なので 33 通り (1.0, 1.125, ..., 5.0) しかない。
+# 6カテゴリ × 33 ビンの件数 (uint64) を共有ファイルに置き、全プロセスから memmap で読み書きする。
+MAGIC = b"LMPS"
+VERSION = 1
+HEADER = struct.Struct("<4sB11x")
+MIN_SUM = QUESTIONS_PER_CATEGORY * 1
+MAX_SUM = QUESTIONS_PER_CATEGORY * 5
+N_BINS = MAX_SUM - MIN_SUM + 1
+
+
+class PopulationStats:
+    """カテゴリ別スコアの母集団ヒストグラム (全セッション・全プロセスで共有)
+
+    1件の追加はロックを取って6つのビンを +1 するだけ (O(1))。
+    パーセンタイルは 33 ビンの累積から計算するので、過去データの走査は発生しない。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        size = HEADER.size + len(CATEGORY_ORDER) * N_BINS * 8
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            if os.fstat(fd).st_size == 0:
+                os.write(fd, HEADER.pack(MAGIC, VERSION))
+                os.ftruncate(fd, size)
+            elif os.fstat(fd).st_size != size or HEADER.unpack(os.pread(fd, HEADER.size, 0)) != (MAGIC, VERSION):
+                raise ValueError(f"{path} は対応していない形式です")
+        finally:
+            os.close(fd)
+        self._counts = np.memmap(path, dtype="<u8", mode="r+", offset=HEADER.size, shape=(len(CATEGORY_ORDER), N_BINS))
+
+    def _locked(self):
+        lock = open(self.path, "rb")
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        return lock
+
+    # --- 更新 ---
+    def add(self, sums):
+        """1人分のカテゴリ別合計 (CATEGORY_ORDER 順の6要素) を加える"""
+        with self._locked():
+            for c, s in enumerate(sums):
+                self._counts[c, s - MIN_SUM] += 1
+
+    def add_many(self, sums):
+        """(N × 6) のカテゴリ別合計をまとめて加える"""
+        sums = np.asarray(sums, dtype=np.intp)
+        added = np.stack([np.bincount(sums[:, c] - MIN_SUM, minlength=N_BINS) for c in range(len(CATEGORY_ORDER))])
+        with self._locked():
+            self._counts += added.astype(np.uint64)
+
+    # --- 参照 ---
+    def histograms(self):
+        """現在の件数のコピー (6 × 33)"""
+        return np.array(self._counts)
+
+    def top_percents(self, sums):
+        """各カテゴリで「上位何%か」{カテゴリ: %} (同点は半分ずつ数える。データが無ければ空)"""
+        counts = self.histograms()
+        totals = counts.sum(axis=1)
+        if not totals.all():
+            return {}
+        result = {}
+        for c, (category, s) in enumerate(zip(CATEGORY_ORDER, sums)):
+            b = s - MIN_SUM
+            higher = counts[c, b + 1:].sum()
+            result[category] = float(100 * (higher + counts[c, b] / 2) / totals[c])
+        return result
+
+
+def rebuild_from_store(stats_path, store_path):
+    """レスポンスストアの全件からヒストグラムを作り直す (初期化・復旧用)"""
+    from response_store import ResponseStore
+
+    histograms = ResponseStore(store_path).category_histograms()
+    stats = PopulationStats(stats_path)
+    with stats._locked():
+        stats._counts[:] = histograms
+    return int(histograms[0].sum())
+
+
+if __name__ == "__main__":
+    # 使い方: python population_stats.py <stats> [rebuild <store>]
+    if len(sys.argv) == 4 and sys.argv[2] == "rebuild":
+        print(f"{rebuild_from_store(sys.argv[1], sys.argv[3])} responses")
+    elif len(sys.argv) == 2:
+        counts = PopulationStats(sys.argv[1]).histograms()
+        for category, row in zip(CATEGORY_ORDER, counts):
+            print(f"{category}: n={row.sum()}")
+    else:
+        sys.exit("usage: python population_stats.py <stats> [rebuild <store>]")
@@ -1,65 +1,8 @@
 # questions.py
 
+import content
+
 # --- 設問データ (Database) ---
-questions_data = {
-    "哲学 (Philosophy)": [
-        "「自分にとっての幸せとは何か」を自分の言葉で語れる。",
-        "社会の常識や他人の期待よりも、自分の心の声を優先できている。",
-        "日々の生活の中で、心から「満たされている」と感じる瞬間が多い。",
-        "過去の選択に対して後悔はなく、すべての経験に意味があったと思える。",
-        "もし明日人生が終わるとしても、今の生き方に納得できる。",
-        "自分の「核」となる価値観を言語化できている。",
-        "迷った時、立ち返るべき判断基準がある。",
-        "迷った時に、自分自身の判断を信頼することができる。",
-    ],
-    "環境 (Environment)": [
-        "現在の住まいや活動場所は、自分にとって居心地が良く、エネルギーが充電できる場所だ。",
-        "将来への不安に脅かされることなく、安心して暮らせる経済的な基盤がある。",
-        "忙しさに追われることなく、何もしない時間や趣味を楽しむ「余白」がある。",
-        "身の回りには、自分がときめく物や好きな物だけを置いている。",
-        "嫌なことや合わない環境からは、距離を置くことができている。",
-        "心から安らげる居場所（家庭やコミュニティ）がある",
-        "ポジティブなエネルギーを与えてくれる人が身近にいる",
-        "自分の能力を発揮できる環境に身を置いている",
-    ],
-    "才能 (Talent)": [
-        "自分が情熱を注げる「強み」や「ギフト」を自覚している",
-        "その才能を使って、他者に貢献している実感がある",
-        "仕事や活動の中で、フロー状態（没頭）になることが多い",
-        "時間を忘れて没頭できることや、やっていて苦にならない「得意なこと」がある。",
-        "自分の才能や強みを使って、誰かに喜んでもらえた経験がある。",
-        "仕事や活動において、無理をして自分を偽ることなく、自然体でいられる。",
-        "「あなたにお願いしたい」「あなたと居たい」と言われる独自の魅力がある。",
-        "新しい知識や体験に触れ、自分をアップデートすることを楽しんでいる。",
-    ],
-    "構想 (Vision)": [
-        "1年後、3年後の理想の未来が鮮明に描けている",
-        "5年後や10年後といった長期で、夢や目標に向かって、具体的な計画が進んでいる",
-        "未来のことを考えるとワクワクする",
-        "将来「こうなっていたい」という理想のライフスタイルが描けている。",
-        "夢や目標を実現するために、今日できる小さな一歩を踏み出している。",
-        "「死ぬまでにやりたいことリスト」のような、人生の楽しみの計画がある。",
-        "予期せぬ変化が起きても、「それはそれで面白い」と柔軟に捉えられる。",
-        "未来のことを考えると、不安よりもワクワクする気持ちの方が大きい。",
-    ],
-    "健康 (Vitality)": [
-        "毎日、十分なエネルギーを持って活動できている",
-        "睡眠や食事など、身体のケアを大切にしている",
-        "ストレスを適切に解消し、メンタルが安定している",
-        "毎朝、すっきりとした気分と十分なエネルギーで目覚めている。",
-        "食事は味わってとり、自分の身体が喜ぶものを食べている感覚がある。",
-        "日中、身体の重さやだるさを感じることなく、快適に動けている。",
-        "質の高い睡眠をとるために、夜の過ごし方を大切にしている。",
-        "自分の身体からのサイン（疲れや痛み）に気づき、すぐにケアできている。"
-    ],
-    "繋がり (Connection)": [
-        "本音を話せる信頼できるパートナーや友人がいる",
-        "人を愛したり愛されているという実感がある",
-        "一緒にいて「一番自分らしくいられる」と感じる人が身近にいる",
-        "一人で何かしようとしたときに、応援や手伝ってくれる人がいる。",
-        "周囲の人に対して、感謝の気持ちを素直に伝えることができている。",
-        "損得勘定抜きで、誰かのために行動することに喜びを感じる。",
-        "孤独感を感じることは少なく、世界や社会と緩やかにつながっている感覚がある。",
-        "自分とは違う考え方の人も受け入れ、対話を楽しむことができる。",
-    ]
-}
\ No newline at end of file
+# 文言は content/questions.json にある。ここはプロセス起動時点の内容 ({カテゴリ: (設問, ...)})。
+# 実行中の変更を反映したい画面は content.current().questions を使う
+questions_data = content.current().questions
@@ -0,0 +1,448 @@
+# response_store.py
+
+import bisect
+import fcntl
+import json
+import os
+import re
+import struct
+import sys
+import time
+
+import numpy as np
+
+from batch_scoring import CATEGORY_ORDER, N_QUESTIONS, QUESTIONS_PER_CATEGORY
+
+# --- 1. ファイル形式 ---
+# [ヘッダー 32 bytes][レコード 32 bytes] × N の追記専用ファイル。
+# レコードは固定長なので、ファイル全体をそのまま numpy の構造化配列として memmap できる。
+MAGIC = b"LMRS"
+VERSION = 1
+HEADER = struct.Struct("<4sBBH24x")  # magic, version, 予約, レコード長
+HEADER_SIZE = HEADER.size
+
+ANSWER_BITS = 3
+PACKED_ANSWER_BYTES = N_QUESTIONS * ANSWER_BITS // 8  # 48問 × 3bit = 18 bytes
+RECORD_MARK = 0xA5  # 書き込み途中・ゼロ埋めのレコードを見分けるための印
+
+RECORD_DTYPE = np.dtype([
+    ("ts", "<u4"),                            # 保存時刻 (UNIX秒。ファイル内で単調増加)
+    ("cohort", "<u2"),                        # コホートタグID (0 = タグなし)
+    ("archetype", "u1"),                      # アーキタイプID (1〜24)
+    ("mark", "u1"),                           # RECORD_MARK
+    ("answers", "u1", PACKED_ANSWER_BYTES),   # 回答 (値-1 を 3bit ずつ詰めたもの)
+    ("sums", "u1", len(CATEGORY_ORDER)),      # カテゴリ別合計 (集計で回答を展開しなくて済むように)
+])
+RECORD_SIZE = RECORD_DTYPE.itemsize
+assert RECORD_SIZE == 32
+
+# コホートタグは URL から来ることがあるので長さと文字種を絞る。ID は uint16 なので 65535 種類まで
+COHORT_TAG = re.compile(r"[0-9A-Za-z_.-]{1,32}")
+MAX_COHORT_ID = np.iinfo(RECORD_DTYPE["cohort"]).max
+
+MIN_SUM = QUESTIONS_PER_CATEGORY * 1
+MAX_SUM = QUESTIONS_PER_CATEGORY * 5
+N_ARCHETYPES = 24
+BLOCK_RECORDS = 1 << 16  # 集計をメモするブロックの大きさ (2 MB)
+
+# 埋まったブロックの集計はストアの隣 (<store>.blocks) にも追記して、プロセスをまたいで使い回す。
+# 1行 = 1ブロック × 1コホートで、1ブロック分の行は1回の write で続けて書く。
+# 各行にそのブロックの行数と有効レコード数を持たせ、全行が揃って件数が合うブロックだけを使う。
+# ブロックの先頭・末尾のレコードも持っておき、ストアと食い違うブロックは使わない
+# .blocks はストアから作り直せる写しなので、形式を変えたら magic を変えて古いファイルは読まずに作り直す
+BLOCKS_MAGIC = b"LMB2"
+BLOCK_SUMMARY_DTYPE = np.dtype([
+    ("block", "<u4"),
+    ("rows", "<u4"),                                                       # このブロックの行数 (コホート数)
+    ("records", "<u4"),                                                    # このブロックの有効レコード数
+    ("cohort", "<u2"),
+    ("first", "V32"),                                                      # ブロック先頭のレコード
+    ("last", "V32"),                                                       # ブロック末尾のレコード
+    ("distribution", "<u4", N_ARCHETYPES + 1),                             # アーキタイプ件数
+    ("histograms", "<u4", (len(CATEGORY_ORDER), MAX_SUM - MIN_SUM + 1)),   # カテゴリ別ヒストグラム
+])
+
+
+# --- 2. 回答の 3bit パック ---
+_BIT_WEIGHTS = np.array([4, 2, 1], dtype=np.uint8)
+
+def pack_answers(answers):
+    """(N × 48) の回答 (1〜5) → (N × 18) bytes"""
+    answers = np.asarray(answers, dtype=np.uint8) - 1
+    bits = (answers[..., None] >> np.array([2, 1, 0], dtype=np.uint8)) & 1
+    return np.packbits(bits.reshape(len(answers), -1), axis=1)
+
+def unpack_answers(packed):
+    """(N × 18) bytes → (N × 48) の回答 (1〜5)"""
+    packed = np.asarray(packed, dtype=np.uint8)
+    bits = np.unpackbits(packed, axis=1).reshape(len(packed), N_QUESTIONS, ANSWER_BITS)
+    return (bits @ _BIT_WEIGHTS).astype(np.uint8) + 1
+
+
+# --- 3. ストア本体 ---
+class ResponseStore:
+    """診断結果を固定長レコードで追記し、memmap でベクトル集計する
+
+    追記はファイルロック (flock) の中で「末尾の整合確認 → 時刻の採番 → 1回の write」を行うので、
+    複数セッション・複数プロセスから同時に書いてもレコードが混ざらず、ファイル内の時刻は単調増加になる。
+    クラッシュで末尾に残った書きかけのレコードは、次の追記時に切り詰め、読み取り時は無視する。
+    """
+
+    def __init__(self, path, fsync=False):
+        self.path = path
+        self.fsync = fsync
+        self._tags_path = path + ".tags.json"
+        self._tags = None
+        self._map = None
+        self._map_size = 0
+        self._blocks = {}
+        self._blocks_path = path + ".blocks"
+        self._blocks_loaded = 0  # .blocks の読み込み済みバイト数
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            if os.fstat(fd).st_size == 0:
+                os.write(fd, HEADER.pack(MAGIC, VERSION, 0, RECORD_SIZE))
+            else:
+                magic, version, _, record_size = HEADER.unpack(os.pread(fd, HEADER_SIZE, 0))
+                if magic != MAGIC or version != VERSION or record_size != RECORD_SIZE:
+                    raise ValueError(f"{path} は対応していない形式です")
+        finally:
+            os.close(fd)
+
+    # --- コホートタグ ---
+    def _load_tags(self):
+        try:
+            with open(self._tags_path, encoding="utf-8") as f:
+                self._tags = json.load(f)
+        except FileNotFoundError:
+            self._tags = {}
+        return self._tags
+
+    def cohort_id(self, tag, create=False):
+        """タグ文字列 → ID (未登録なら create=True のときだけ採番。空文字は 0)"""
+        if not tag:
+            return 0
+        if self._tags is None or tag not in self._tags:
+            self._load_tags()
+        if tag in self._tags or not create:
+            return self._tags.get(tag)
+        if not COHORT_TAG.fullmatch(tag):
+            raise ValueError(f"コホートタグは英数字と _ . - の32文字以内である必要があります: {tag[:40]!r}")
+        with open(self._tags_path + ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            tags = self._load_tags()
+            if tag not in tags:
+                if len(tags) >= MAX_COHORT_ID:
+                    raise ValueError(f"コホートタグが上限 ({MAX_COHORT_ID} 種類) に達したので {tag!r} を登録できません")
+                tags[tag] = max(tags.values(), default=0) + 1
+                with open(self._tags_path + ".tmp", "w", encoding="utf-8") as f:
+                    json.dump(tags, f, ensure_ascii=False)
+                os.replace(self._tags_path + ".tmp", self._tags_path)
+            return tags[tag]
+
+    # --- 追記 ---
+    def append(self, answers, archetype_id, cohort=""):
+        """1件追記 (answers は48個の 1〜5)"""
+        self.append_many([answers], [archetype_id], cohort)
+
+    def append_many(self, answers, archetype_ids, cohort=""):
+        """(N × 48) の回答と N 個のアーキタイプIDをまとめて追記"""
+        answers = np.asarray(answers, dtype=np.uint8)
+        if answers.ndim != 2 or answers.shape[1] != N_QUESTIONS or answers.min() < 1 or answers.max() > 5:
+            raise ValueError(f"回答は (N × {N_QUESTIONS}) の 1〜5 である必要があります")
+        archetype_ids = np.asarray(archetype_ids)
+        if (archetype_ids.shape != (len(answers),) or archetype_ids.dtype.kind not in "iu"
+                or archetype_ids.min() < 1 or archetype_ids.max() > N_ARCHETYPES):
+            raise ValueError(f"アーキタイプIDは回答と同じ数の 1〜{N_ARCHETYPES} の整数である必要があります")
+
+        records = np.zeros(len(answers), dtype=RECORD_DTYPE)
+        records["cohort"] = self.cohort_id(cohort, create=True)
+        records["archetype"] = archetype_ids
+        records["mark"] = RECORD_MARK
+        records["answers"] = pack_answers(answers)
+        records["sums"] = answers.reshape(len(answers), len(CATEGORY_ORDER), QUESTIONS_PER_CATEGORY).sum(axis=2)
+
+        fd = os.open(self.path, os.O_RDWR | os.O_APPEND)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            size = os.fstat(fd).st_size
+            torn = (size - HEADER_SIZE) % RECORD_SIZE
+            if torn:
+                # 前回のクラッシュで残った書きかけのレコードを捨てる
+                size -= torn
+                os.ftruncate(fd, size)
+            last_ts = 0
+            if size > HEADER_SIZE:
+                last_ts = struct.unpack("<I", os.pread(fd, 4, size - RECORD_SIZE))[0]
+            records["ts"] = max(int(time.time()), last_ts)
+            os.write(fd, records.tobytes())
+            if self.fsync:
+                os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    # --- 読み取り ---
+    @staticmethod
+    def _valid(recs):
+        """集計に使えるレコード (書き込み済みの印があり、アーキタイプIDが範囲内)"""
+        archetypes = recs["archetype"]
+        return (recs["mark"] == RECORD_MARK) & (archetypes >= 1) & (archetypes <= N_ARCHETYPES)
+
+    def records(self):
+        """全レコードの読み取り専用 memmap (追記されていれば開き直す)"""
+        size = os.path.getsize(self.path)
+        size -= (size - HEADER_SIZE) % RECORD_SIZE
+        if self._map is None or size != self._map_size:
+            count = (size - HEADER_SIZE) // RECORD_SIZE
+            self._map = np.memmap(self.path, dtype=RECORD_DTYPE, mode="r", offset=HEADER_SIZE, shape=(count,)) if count else np.zeros(0, RECORD_DTYPE)
+            self._map_size = size
+        return self._map
+
+    def __len__(self):
+        return len(self.records())
+
+    @staticmethod
+    def _time_range(recs, start, end):
+        """期間 [start, end) に入るレコードの添字範囲 (時刻は単調増加なので二分探索)"""
+        # np.searchsorted はストライドのある列を丸ごとコピーするので、要素アクセスだけの bisect を使う
+        ts = recs["ts"]
+        lo = 0 if start is None else bisect.bisect_left(ts, start)
+        hi = len(recs) if end is None else bisect.bisect_left(ts, end, lo)
+        return lo, hi
+
+    def _where(self, start=None, end=None, cohort=None):
+        """(期間でスライスしたレコード, 追加の絞り込みマスク or None)
+
+        期間は二分探索でスライスする (全件走査しない)。マスクは必要な列にだけ適用し、レコード全体はコピーしない。
+        """
+        recs = self.records()
+        if start is not None or end is not None:
+            lo, hi = self._time_range(recs, start, end)
+            recs = recs[lo:hi]
+        mask = self._valid(recs)
+        if cohort is not None:
+            cohort_id = self.cohort_id(cohort)
+            mask &= recs["cohort"] == (cohort_id if cohort_id is not None else -1)
+        return recs, (None if mask.all() else mask)
+
+    def column(self, name, **where):
+        """絞り込んだレコードの1列 (ts / cohort / archetype / answers / sums)"""
+        recs, mask = self._where(**where)
+        values = recs[name]
+        return values if mask is None else values[mask]
+
+    def select(self, **where):
+        """絞り込んだレコード (構造化配列)"""
+        recs, mask = self._where(**where)
+        return recs if mask is None else recs[mask]
+
+    # --- 集計 ---
+    # 追記専用なので、埋まったブロック (BLOCK_RECORDS 件) の集計結果は二度と変わらない。
+    # ブロックごと・コホートごとの (アーキタイプ件数, カテゴリ別ヒストグラム) をメモしておき、
+    # 2回目以降のクエリは「ブロック集計の足し算 + 期間の端と末尾の未完成ブロックの走査」だけで済ませる。
+    # メモは <store>.blocks にも残すので、CLI や再起動したワーカーの最初のクエリでも全件は走査しない。
+    def _scan(self, recs, mask=None):
+        """レコードを直接走査して (アーキタイプ件数 25, ヒストグラム 6 × 33) を数える"""
+        archetypes = recs["archetype"]
+        sums = recs["sums"]
+        if mask is not None:
+            archetypes, sums = archetypes[mask], sums[mask]
+        distribution = np.bincount(archetypes, minlength=N_ARCHETYPES + 1)
+        histograms = np.stack([
+            np.bincount(sums[:, c], minlength=MAX_SUM + 1)[MIN_SUM:]
+            for c in range(len(CATEGORY_ORDER))
+        ])
+        return distribution, histograms
+
+    def _load_block_summaries(self, recs):
+        """<store>.blocks のうち未読の行を読み、揃っていてストアと一致するブロックの集計をメモに入れる"""
+        try:
+            with open(self._blocks_path, "rb") as f:
+                fcntl.flock(f, fcntl.LOCK_SH)  # 書き込み途中の行を読まない
+                if f.read(len(BLOCKS_MAGIC)) != BLOCKS_MAGIC:
+                    return
+                offset = max(self._blocks_loaded, len(BLOCKS_MAGIC))
+                f.seek(offset)
+                data = f.read()
+        except OSError:
+            return
+        rows = np.frombuffer(data[:len(data) - len(data) % BLOCK_SUMMARY_DTYPE.itemsize], dtype=BLOCK_SUMMARY_DTYPE)
+        i = 0
+        while i < len(rows):
+            block, count = int(rows["block"][i]), int(rows["rows"][i])
+            group = rows[i:i + count]
+            if len(group) < count:
+                break  # 末尾のブロックが揃っていない (次に読むときにもう一度見る)
+            if count == 0 or (group["block"] != block).any() or (group["rows"] != count).any() \
+                    or len(set(group["cohort"].tolist())) != count \
+                    or int(group["distribution"].sum()) != int(rows["records"][i]):
+                i += 1  # クラッシュで途切れたブロックの残り。次の行から読み直す
+                continue
+            i += count
+            end = (block + 1) * BLOCK_RECORDS
+            if block in self._blocks or end > len(recs) \
+                    or bytes(group["first"][0]) != recs[end - BLOCK_RECORDS:end - BLOCK_RECORDS + 1].tobytes() \
+                    or bytes(group["last"][0]) != recs[end - 1:end].tobytes():
+                continue
+            self._blocks[block] = {
+                int(row["cohort"]): (row["distribution"].astype(np.int64), row["histograms"].astype(np.int64))
+                for row in group
+            }
+        self._blocks_loaded = offset + i * BLOCK_SUMMARY_DTYPE.itemsize
+
+    def _save_block_summary(self, recs, block, summary):
+        """埋まったブロックの集計を <store>.blocks に追記する (書けなければメモリ上のメモだけ使う)"""
+        rows = np.zeros(len(summary), dtype=BLOCK_SUMMARY_DTYPE)
+        start = block * BLOCK_RECORDS
+        rows["block"] = block
+        rows["rows"] = len(summary)
+        rows["records"] = sum(int(distribution.sum()) for distribution, _ in summary.values())
+        rows["first"] = recs[start:start + 1].tobytes()
+        rows["last"] = recs[start + BLOCK_RECORDS - 1:start + BLOCK_RECORDS].tobytes()
+        for row, (cohort_id, (distribution, histograms)) in zip(rows, summary.items()):
+            row["cohort"] = cohort_id
+            row["distribution"] = distribution
+            row["histograms"] = histograms
+        try:
+            fd = os.open(self._blocks_path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        except OSError:
+            return
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            size = os.fstat(fd).st_size
+            if size == 0:
+                os.write(fd, BLOCKS_MAGIC)
+                size = len(BLOCKS_MAGIC)
+            elif os.pread(fd, len(BLOCKS_MAGIC), 0) != BLOCKS_MAGIC:
+                os.ftruncate(fd, 0)
+                os.write(fd, BLOCKS_MAGIC)
+                size = len(BLOCKS_MAGIC)
+            torn = (size - len(BLOCKS_MAGIC)) % BLOCK_SUMMARY_DTYPE.itemsize
+            if torn:
+                os.ftruncate(fd, size - torn)
+            os.write(fd, rows.tobytes())
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def _block_summary(self, recs, block):
+        """埋まったブロックのコホート別集計 {cohort_id: (件数, ヒストグラム)} (メモ化・<store>.blocks に永続化)"""
+        summary = self._blocks.get(block)
+        if summary is None:
+            self._load_block_summaries(recs)
+            summary = self._blocks.get(block)
+        if summary is None:
+            chunk = recs[block * BLOCK_RECORDS:(block + 1) * BLOCK_RECORDS]
+            valid = self._valid(chunk)
+            if not valid.all():
+                chunk = chunk[valid]
+            # コホート × 値 の添字にして、件数とヒストグラムをそれぞれ1回の bincount で数える
+            cohort_col = chunk["cohort"]
+            lowest = int(cohort_col.min()) if len(chunk) else 0
+            highest = int(cohort_col.max()) if len(chunk) else 0
+            if lowest == highest:
+                # ブロック全体が同じコホート (通常のケース) ならコホートの添字計算を省く
+                cohorts, group = np.array([lowest]), None
+            elif highest < 256:
+                cohorts, group = np.arange(highest + 1), cohort_col.astype(np.intp)
+            else:
+                cohorts, group = np.unique(cohort_col, return_inverse=True)
+            k = len(cohorts)
+            n_cat = len(CATEGORY_ORDER)
+            n_bins = MAX_SUM - MIN_SUM + 1
+
+            archetype_index = chunk["archetype"].astype(np.intp)
+            sums_index = chunk["sums"].astype(np.intp)
+            sums_index += np.arange(n_cat) * n_bins - MIN_SUM
+            if group is not None:
+                archetype_index += group * (N_ARCHETYPES + 1)
+                sums_index += (group * (n_cat * n_bins))[:, None]
+            distribution = np.bincount(archetype_index, minlength=k * (N_ARCHETYPES + 1)).reshape(k, N_ARCHETYPES + 1)
+            histograms = np.bincount(sums_index.ravel(), minlength=k * n_cat * n_bins).reshape(k, n_cat, n_bins)
+            summary = {int(c): (distribution[g], histograms[g]) for g, c in enumerate(cohorts) if distribution[g].any()}
+            self._blocks[block] = summary
+            self._save_block_summary(recs, block, summary)
+        return summary
+
+    def aggregate(self, start=None, end=None, cohort=None):
+        """期間 [start, end) (UNIX秒) とコホートで絞り込んだ (アーキタイプ件数, ヒストグラム)"""
+        recs = self.records()
+        cohort_id = None
+        if cohort is not None:
+            cohort_id = self.cohort_id(cohort)
+            if cohort_id is None:
+                return self._scan(recs[:0])
+
+        lo, hi = self._time_range(recs, start, end)
+
+        def scan_range(a, b):
+            part = recs[a:b]
+            mask = self._valid(part)
+            if cohort_id is not None:
+                mask &= part["cohort"] == cohort_id
+            return self._scan(part, mask)
+
+        first_block = -(-lo // BLOCK_RECORDS)
+        last_block = hi // BLOCK_RECORDS
+        if first_block >= last_block:
+            return scan_range(lo, hi)
+
+        distribution, histograms = scan_range(lo, first_block * BLOCK_RECORDS)
+        for block in range(first_block, last_block):
+            summary = self._block_summary(recs, block)
+            parts = summary.values() if cohort_id is None else [summary[cohort_id]] if cohort_id in summary else []
+            for d, h in parts:
+                distribution = distribution + d
+                histograms = histograms + h
+        d, h = scan_range(last_block * BLOCK_RECORDS, hi)
+        return distribution + d, histograms + h
+
+    def archetype_distribution(self, **where):
+        """アーキタイプIDごとの件数 (添字 = ID, 長さ 25)"""
+        return self.aggregate(**where)[0]
+
+    def category_histograms(self, **where):
+        """カテゴリ別合計のヒストグラム (6 × 33。列 k = 合計 8 + k、平均なら (8 + k) / 8)"""
+        return self.aggregate(**where)[1]
+
+    def category_means(self, **where):
+        """カテゴリ別平均 {カテゴリ: 平均} (ヒストグラムから計算)"""
+        histograms = self.category_histograms(**where)
+        counts = histograms.sum(axis=1)
+        if not counts.any():
+            return {}
+        means = histograms @ np.arange(MIN_SUM, MAX_SUM + 1) / (counts * QUESTIONS_PER_CATEGORY)
+        return dict(zip(CATEGORY_ORDER, means.tolist()))
+
+    def answers(self, **where):
+        """絞り込んだレコードの回答を展開した (N × 48) 行列"""
+        return unpack_answers(self.column("answers", **where))
+
+
+if __name__ == "__main__":
+    # 使い方: python response_store.py <store> [--cohort TAG] [--since UNIX秒] [--until UNIX秒]
+    if len(sys.argv) < 2:
+        sys.exit("usage: python response_store.py <store> [--cohort TAG] [--since TS] [--until TS]")
+    args = sys.argv[2:]
+    where = {}
+    if "--cohort" in args:
+        where["cohort"] = args[args.index("--cohort") + 1]
+    if "--since" in args:
+        where["start"] = int(args[args.index("--since") + 1])
+    if "--until" in args:
+        where["end"] = int(args[args.index("--until") + 1])
+
+    store = ResponseStore(sys.argv[1])
+    started = time.perf_counter()
+    distribution = store.archetype_distribution(**where)
+    means = store.category_means(**where)
+    elapsed = time.perf_counter() - started
+    print(f"{distribution.sum()} / {len(store)} records ({elapsed * 1000:.1f} ms)")
+    for archetype_id in np.nonzero(distribution)[0]:
+        print(f"  Type {archetype_id:>2}: {distribution[archetype_id]}")
+    for category, mean in means.items():
+        print(f"  {category}: {mean:.2f}")
@@ -0,0 +1,252 @@
+# result_view.py
+
+import collections
+import functools
+import html
+import math
+import re
+
+import streamlit as st
+
+from archetype_rules import classify_scores
+from content import current as current_content
+from feedback import score_level
+from metrics import span
+
+# --- 1. H/M/L のスタイル ---
+# level → (タグのCSSクラス, スコアバーの色)
+LEVEL_STYLES = {
+    "H": ("tag-blue", "#dbeafe"),
+    "M": ("tag-green", "#dcfce7"),
+    "L": ("tag-red", "#fee2e2"),
+}
+
+# 名前は共有リンクのトークンから来るので、Markdown として解釈させない (リンク・画像・自動リンクを作らせない)
+_MARKDOWN_SPECIAL = re.compile(r"([\\`*_{}\[\]()<>#+\-.!|~:$])")
+
+def escape_markdown(text):
+    return _MARKDOWN_SPECIAL.sub(r"\\\1", text)
+
+def feedback_block(category, level, content=None):
+    """(カテゴリ, level) ごとのタグ文言とアドバイスHTML (content を省略すると現在の文言)"""
+    return _feedback_block(category, level, content or current_content())
+
+# 組み合わせは 6 × 3 通りなので、文言の版 (Content) ごとに一度作れば使い回せる
+@functools.lru_cache(maxsize=4 * 6 * len(LEVEL_STYLES))
+def _feedback_block(category, level, content):
+    tag_text, feedback_text = content.definitions[category][level]
+    return tag_text, f'<div class="feedback-box">{feedback_text}</div>'
+
+def percentile_html(top_percent):
+    """「上位 X%」の表示 (データが無いときは空)"""
+    if top_percent is None:
+        return ""
+    label = "上位 1% 未満" if top_percent < 1 else f"上位 {top_percent:.0f}%"
+    return f'<span style="color: #64748b; font-size: 0.85rem; margin-left: 6px;">{label}</span>'
+
+def score_bar_html(category, score, top_percent=None, content=None):
+    """スコアバー (カテゴリ名・点数・タグ・上位何% + 横棒) のHTML"""
+    level = score_level(score)
+    level_color, bar_bg = LEVEL_STYLES[level]
+    tag_text, _ = feedback_block(category, level, content)
+    return f"""
+        <div style="margin-top: 10px; margin-bottom: 2px;">
+            <span style="font-weight:bold;">{category}: {score:.1f}</span>
+            <span class="{level_color}">{tag_text}</span>
+            {percentile_html(top_percent)}
+        </div>
+        <div style="width: 100%; background-color: #f3f4f6; border-radius: 5px; height: 8px;">
+            <div style="width: {score/5*100}%; background-color: {bar_bg}; height: 8px; border-radius: 5px;"></div>
+        </div>
+        """
+
+def question_html(question):
+    """「あなたへの問い」のボックス"""
+    return f"""
+    <div style="background-color: #fff7ed; border-left: 5px solid #f97316; padding: 15px; border-radius: 5px; margin-top: 10px; margin-bottom: 20px; color: #431407;">
+        <span style="font-size: 0.9rem; color: #c2410c;">🤔 あなたへの問い</span>
+        <div style="margin-top: 10px; font-weight: bold; font-size: 1.1rem; line-height: 1.5;">
+            {question}
+        </div>
+    </div>
+    """
+
+
+# --- 2. レーダーチャート (Plotly) ---
+# 図の骨格は一度だけ作り、呼び出しごとに r (6カテゴリの値) と名前だけを差し替える。
+# template を空にして Plotly 既定テーマ (数KB) を送らない。見た目は Streamlit テーマが適用される。
+RADAR_TEMPLATE = {
+    "data": [{
+        "type": "scatterpolar",
+        "fill": "toself",
+        "line": {"color": "#1E3A8A"},
+        "fillcolor": "rgba(30, 58, 138, 0.2)",
+    }],
+    "layout": {
+        "polar": {"radialaxis": {"visible": True, "range": [0, 5]}},
+        "showlegend": False,
+        "margin": {"l": 40, "r": 40, "t": 30, "b": 30},
+        "template": {},
+    },
+}
+
+def radar_figure(categories, values, name):
+    """テンプレートに値を差し込んだ Plotly 図 (dict)。st.plotly_chart にそのまま渡せる"""
+    trace = dict(RADAR_TEMPLATE["data"][0], r=list(values), theta=list(categories), name=html.escape(name))
+    return {"data": [trace], "layout": RADAR_TEMPLATE["layout"]}
+
+
+# --- 3. レーダーチャート (静的SVG) ---
+# Plotly JS を読み込まずに表示できる軽量版。角度は Plotly と同じく右(0°)から反時計回り。
+SVG_SIZE = 420
+SVG_MARGIN = 90
+SVG_LABEL_PAD = 80  # 左右のカテゴリ名がはみ出さないよう横方向だけ余白を足す
+SVG_MAX_SCORE = 5
+
+def _polar(center, radius, k, n):
+    angle = 2 * math.pi * k / n
+    return center + radius * math.cos(angle), center - radius * math.sin(angle)
+
+def _points(center, radii, n):
+    return " ".join(f"{x:.1f},{y:.1f}" for x, y in (_polar(center, r, k, n) for k, r in enumerate(radii)))
+
+@functools.lru_cache(maxsize=1024)
+def radar_svg(categories, values, size=SVG_SIZE):
+    """カテゴリ名と値 (いずれも tuple) から静的SVGのレーダーチャートを作る"""
+    n = len(categories)
+    center = size / 2
+    unit = (size / 2 - SVG_MARGIN) / SVG_MAX_SCORE
+
+    width = size + 2 * SVG_LABEL_PAD
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="{-SVG_LABEL_PAD} 0 {width} {size}" width="100%" role="img" '
+             f'style="max-width: {width}px; display: block; margin: 0 auto;" font-family="sans-serif" font-size="12">']
+    # 目盛りの同心多角形と軸
+    for level in range(1, SVG_MAX_SCORE + 1):
+        parts.append(f'<polygon points="{_points(center, [level * unit] * n, n)}" fill="none" stroke="#e5e7eb"/>')
+    for k in range(n):
+        x, y = _polar(center, SVG_MAX_SCORE * unit, k, n)
+        parts.append(f'<line x1="{center}" y1="{center}" x2="{x:.1f}" y2="{y:.1f}" stroke="#e5e7eb"/>')
+    # 値の多角形
+    parts.append(f'<polygon points="{_points(center, [v * unit for v in values], n)}" '
+                 f'fill="rgba(30, 58, 138, 0.2)" stroke="#1E3A8A" stroke-width="2"/>')
+    # カテゴリ名
+    for k, category in enumerate(categories):
+        x, y = _polar(center, SVG_MAX_SCORE * unit + 12, k, n)
+        anchor = "start" if x > center + 1 else "end" if x < center - 1 else "middle"
+        parts.append(f'<text x="{x:.1f}" y="{y:.1f}" text-anchor="{anchor}" dominant-baseline="middle" fill="#334155">{category}</text>')
+    parts.append("</svg>")
+    return "".join(parts)
+
+
+# --- 4. 結果パネル ---
+# 描画の部品 (st を呼ばずに作れる部分)。入力が同じなら使い回せるので、パーマリンクではトークンごとにキャッシュする
+ResultParts = collections.namedtuple("ResultParts", "archetype_id archetype chart radar sections")
+
+def build_result(name, user_scores, chart="plotly", percentiles=None, content=None):
+    """アーキタイプ判定・レーダーチャート・各要素のスコアバーとアドバイスHTMLを作る
+
+    文言は content (省略すると現在の版) から引くので、判定ロジックを変えずに文言だけ差し替えられる。
+    sections: ((カテゴリ, スコアバーHTML, アドバイスHTML), ...)
+    """
+    content = content or current_content()
+    with span("archetype"):
+        archetype_id = classify_scores(user_scores)
+    archetype = content.archetypes[archetype_id]
+
+    categories = tuple(user_scores.keys())
+    values = tuple(user_scores.values())
+    with span("figure"):
+        radar = radar_svg(categories, values) if chart == "svg" else radar_figure(categories, values, name)
+
+    sections = tuple(
+        (cat, score_bar_html(cat, score, (percentiles or {}).get(cat), content), feedback_block(cat, score_level(score), content)[1])
+        for cat, score in user_scores.items()
+    )
+    return ResultParts(archetype_id, archetype, chart, radar, sections)
+
+def render_radar(parts):
+    # 図の組み立ては build_result の "figure"。こちらはブラウザへ送る分 (Plotly は JSON への変換を含む)
+    with span("chart"):
+        if parts.chart == "svg":
+            st.markdown(parts.radar, unsafe_allow_html=True)
+        else:
+            st.plotly_chart(parts.radar, use_container_width=True)
+
+def show_result(name, parts, celebrate=True):
+    """build_result の部品を描画する (celebrate=False のときは風船を出さず、完了メッセージを見出しに替える)"""
+    archetype_name, description, icon, question = parts.archetype
+
+    if celebrate:
+        st.balloons()
+        st.success(f"診断完了！ {escape_markdown(name)} さんの現在地が見つかりました。")
+    elif name:
+        st.success(f"{escape_markdown(name)} さんの診断結果")
+    col1, col2 = st.columns([1, 1.2])
+
+    with col1:
+        # レーダーチャート
+        render_radar(parts)
+
+    with col2:
+        st.markdown(f"### {icon} {archetype_name}")
+
+        # 説明文（既存）
+        st.info(description)
+
+        # ▼ 【重要】 「あなたへの問い」のデザインを変更（改行・太字・サイズ調整）
+        st.markdown(question_html(question), unsafe_allow_html=True)
+
+        st.markdown("#### Life Elements Analysis")
+
+        # 各要素の詳細レポート表示
+        with span("feedback"):
+            for cat, bar_html, feedback_html in parts.sections:
+                # スコアバー表示
+                st.markdown(bar_html, unsafe_allow_html=True)
+
+                # フィードバック文章
+                with st.expander(f"▼ {cat}のアドバイスを読む"):
+                    st.markdown(feedback_html, unsafe_allow_html=True)
+
+    # Noteへの誘導
+    st.markdown("---")
+    st.markdown("### 🎁 Next Step")
+    st.markdown(f"""
+    **{archetype_name}** のあなたへ。
+
+    この診断結果はあくまで「現在地」です。
+    この診断結果をもとに、より詳細な地図を描いてみませんか？
+
+    **👉 [Life Mapping Coaching (note)](https://note.com/toyamanchu1986/n/nd31342d61419)**
+    """)
+
+def render_result(name, user_scores, chart="plotly", percentiles=None, content=None, celebrate=True):
+    """診断結果 (レーダーチャート・アーキタイプ・各要素のフィードバック) を描画し、アーキタイプIDを返す
+
+    percentiles: {カテゴリ: 上位何%} (population_stats.PopulationStats.top_percents の戻り値)
+    """
+    parts = build_result(name, user_scores, chart, percentiles, content)
+    show_result(name, parts, celebrate)
+    return parts.archetype_id
+
+
+# --- 5. 感度分析 (どの回答で結果が変わるか) ---
+def _change_label(flip, content):
+    i = int(flip.question.rsplit("_", 1)[1])
+    return f"Q.{i + 1}「{content.questions[flip.category][i]}」 {flip.from_value}→{flip.to_value}"
+
+def boundary_html(boundary, content):
+    """境界1つ: 「カテゴリ +1点: Q.3「…」 3→4 → 🏰 Type 7: …」"""
+    changes = "、".join(_change_label(f, content) for f in boundary.changes)
+    name, _, icon, _ = content.archetypes[boundary.archetype_id]
+    return f"**{boundary.category}** {boundary.delta:+d}点: {changes} → {icon} {name}"
+
+def render_sensitivity(report, content=None):
+    """sensitivity.analyze の結果から、アーキタイプが変わる最も近い境界を表示する"""
+    content = content or current_content()
+    with span("sensitivity"), st.expander("🔍 どの回答が変わると結果が変わる？"):
+        if not report.boundaries:
+            st.markdown("同じカテゴリの回答を1〜2問変えても、アーキタイプは変わりません。")
+            return
+        st.markdown(f"1問だけ変えるとアーキタイプが変わる回答: **{len(report.flips)}** 通り")
+        st.markdown("\n".join(f"- {boundary_html(b, content)}" for b in report.boundaries))
@@ -0,0 +1,240 @@
+# scoring_service.py
+
+import asyncio
+import functools
+import json
+import sys
+import time
+
+import numpy as np
+
+from batch_scoring import CATEGORY_ORDER, N_QUESTIONS, score_answers
+from content import current as current_content
+from feedback import score_level
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8600
+MAX_BODY_BYTES = 8 * 1024 * 1024
+
+
+# --- 1. レスポンスの部品 (文言の版ごとに一度だけ作る) ---
+@functools.lru_cache(maxsize=2)
+def response_parts(content):
+    """Content → ({ID: アーキタイプ部分}, {(カテゴリ, level): フィードバック部分})"""
+    archetypes = {
+        archetype_id: {"archetype_id": archetype_id, "name": name, "description": description, "icon": icon, "question": question}
+        for archetype_id, (name, description, icon, question) in content.archetypes.items()
+    }
+    feedback = {
+        (category, level): {"level": level, "tag": tag_text, "text": feedback_text}
+        for category, levels in content.definitions.items()
+        for level, (tag_text, feedback_text) in levels.items()
+    }
+    return archetypes, feedback
+
+def build_result(means, archetype_id, content=None):
+    """カテゴリ平均 (6要素) とアーキタイプID → レスポンス用 dict"""
+    archetypes, feedback = response_parts(content or current_content())
+    result = dict(archetypes[archetype_id])
+    result["scores"] = dict(zip(CATEGORY_ORDER, means))
+    result["feedback"] = {category: feedback[category, score_level(score)] for category, score in result["scores"].items()}
+    return result
+
+
+# --- 2. マイクロバッチ ---
+class MicroBatcher:
+    """同時に届いたリクエストをまとめて1回のベクトル演算で採点する
+
+    最初のリクエストが届いたら、イベントループの現在の周回が終わる時点 (max_delay=0) か
+    max_delay 秒後に、その間に溜まった分をまとめて採点する。max_batch 行に達したら即座に採点する。
+    """
+
+    def __init__(self, max_batch=1024, max_delay=0.0):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._pending = []
+        self._pending_rows = 0
+        self._scheduled = None
+        self.batches = 0
+        self.rows = 0
+
+    def submit(self, answers):
+        """(k × 48) の回答行列を登録し、k 件の結果リストを返す Future を受け取る"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((answers, future))
+        self._pending_rows += len(answers)
+        if self._pending_rows >= self.max_batch:
+            self.flush()
+        elif self._scheduled is None:
+            if self.max_delay > 0:
+                self._scheduled = loop.call_later(self.max_delay, self.flush)
+            else:
+                self._scheduled = loop.call_soon(self.flush)
+        return future
+
+    def flush(self):
+        if self._scheduled is not None:
+            self._scheduled.cancel()
+            self._scheduled = None
+        pending, self._pending, self._pending_rows = self._pending, [], 0
+        if not pending:
+            return
+
+        means, ids = score_answers(np.concatenate([answers for answers, _ in pending]))
+        means, ids = means.tolist(), ids.tolist()
+        self.batches += 1
+        self.rows += len(ids)
+
+        content = current_content()
+        start = 0
+        for answers, future in pending:
+            end = start + len(answers)
+            if not future.cancelled():
+                future.set_result([build_result(m, i, content) for m, i in zip(means[start:end], ids[start:end])])
+            start = end
+
+
+# --- 3. リクエストの解釈 ---
+class BadRequest(Exception):
+    pass
+
+def parse_submissions(payload):
+    """{"answers": [...]} / {"submissions": [{"answers": [...]}, ...]} → ((k × 48) 行列, 一括かどうか)"""
+    if isinstance(payload, dict) and "answers" in payload:
+        rows, bulk = [payload["answers"]], False
+    elif isinstance(payload, dict) and isinstance(payload.get("submissions"), list):
+        rows, bulk = [s.get("answers") if isinstance(s, dict) else s for s in payload["submissions"]], True
+    else:
+        raise BadRequest('"answers" または "submissions" が必要です')
+
+    if not rows:
+        raise BadRequest("submissions が空です")
+    for row in rows:
+        if not isinstance(row, list) or len(row) != N_QUESTIONS:
+            raise BadRequest(f"answers は {N_QUESTIONS} 個の整数の配列である必要があります")
+        # 3.9 や true を黙って整数に丸めない (bool は int のサブクラスなので type で比べる)
+        if not all(type(v) is int and 1 <= v <= 5 for v in row):
+            raise BadRequest("回答は 1〜5 の整数である必要があります")
+    return np.array(rows, dtype=np.int8), bulk
+
+
+# --- 4. HTTP サーバー (asyncio streams, keep-alive 対応の最小実装) ---
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large"}
+
+def _response(status, body, keep_alive):
+    data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+        f"Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(data)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode("ascii") + data
+
+class ScoringService:
+    def __init__(self, batcher=None):
+        self.batcher = batcher or MicroBatcher()
+
+    async def handle_request(self, method, path, body):
+        """(status, JSON にする dict) を返す"""
+        if path == "/health":
+            return 200, {"status": "ok", "batches": self.batcher.batches, "rows": self.batcher.rows}
+        if path != "/score":
+            return 404, {"error": "not found"}
+        if method != "POST":
+            return 405, {"error": "POST /score を使ってください"}
+        try:
+            answers, bulk = parse_submissions(json.loads(body))
+        except (BadRequest, ValueError, OverflowError) as e:
+            return 400, {"error": str(e)}
+        results = await self.batcher.submit(answers)
+        return 200, {"results": results} if bulk else results[0]
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = headers.get("connection", "").lower() != "close"
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY_BYTES:
+                    writer.write(_response(413, {"error": "payload too large"}, False))
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                status, payload = await self.handle_request(method, path.split("?", 1)[0], body)
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"scoring service listening on http://{host}:{port}", file=sys.stderr)
+        async with server:
+            await server.serve_forever()
+
+
+# --- 5. ローカル負荷クライアント (動作確認・性能計測用) ---
+async def _client(host, port, n_requests, latencies, rng):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(n_requests):
+            body = json.dumps({"answers": rng.integers(1, 6, N_QUESTIONS).tolist()}).encode("utf-8")
+            started = time.perf_counter()
+            writer.write(
+                f"POST /score HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n".encode("ascii") + body
+            )
+            await writer.drain()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line == b"\r\n":
+                    break
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":")[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - started)
+    finally:
+        writer.close()
+
+async def run_bench(host=DEFAULT_HOST, port=DEFAULT_PORT, requests=20_000, concurrency=64):
+    """keep-alive 接続 concurrency 本で計 requests 件送り、(req/s, p50 ms, p99 ms) を返す"""
+    latencies = []
+    rng = np.random.default_rng(0)
+    per_client = requests // concurrency
+    started = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, per_client, latencies, rng) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    return len(latencies) / elapsed, p50, p99
+
+
+if __name__ == "__main__":
+    # 使い方: python scoring_service.py [serve] [--port N] | bench [--port N] [--requests N] [--concurrency N]
+    args = sys.argv[1:]
+    def option(name, default):
+        return type(default)(args[args.index(name) + 1]) if name in args else default
+
+    port = option("--port", DEFAULT_PORT)
+    if args[:1] == ["bench"]:
+        rps, p50, p99 = asyncio.run(run_bench(port=port, requests=option("--requests", 20_000), concurrency=option("--concurrency", 64)))
+        print(f"{rps:,.0f} req/s  p50 {p50:.2f} ms  p99 {p99:.2f} ms")
+    else:
+        asyncio.run(ScoringService().serve(option("--host", DEFAULT_HOST), port))
@@ -0,0 +1,101 @@
+# sensitivity.py
+
+import collections
+import sys
+import time
+
+import numpy as np
+
+from batch_scoring import CATEGORY_ORDER, QUESTIONS_PER_CATEGORY, N_QUESTIONS, classify_sums
+
+MIN_ANSWER, MAX_ANSWER = 1, 5
+
+# --- 1. 結果の形 ---
+# 1問の回答を from_value → to_value に変えると archetype_id になる
+Flip = collections.namedtuple("Flip", "question category from_value to_value archetype_id")
+# category の合計を delta 動かすと archetype_id に変わる、最も近い境界。changes はそれを実現する回答の変更 (Flip と同じ形)
+Boundary = collections.namedtuple("Boundary", "category delta archetype_id changes")
+# archetype_id: 今のアーキタイプ / flips: アーキタイプが変わる1問の変更すべて (変更幅の小さい順)
+# boundaries: カテゴリごと・上下それぞれの最も近い境界 (|delta| の小さい順)
+Sensitivity = collections.namedtuple("Sensitivity", "archetype_id flips boundaries")
+
+
+# --- 2. 分析 ---
+# 判定はカテゴリ合計だけで決まるので、1問の変更の結果は「どのカテゴリを何点動かすか」(6 × 最大8通り) で尽くせる。
+# 同じカテゴリ内の2問の変更も、合計の動き (6 × 最大16通り) だけ判定すればよい。
+# 候補の合計ベクトルを1つの行列に並べ、classify_sums で一度に判定する。
+def _reach(values, n):
+    """カテゴリ内の回答のうち n 問までを変えたときの合計の動きの範囲 (下限, 上限)"""
+    down = sorted(MIN_ANSWER - v for v in values)[:n]
+    up = sorted((MAX_ANSWER - v for v in values), reverse=True)[:n]
+    return sum(down), sum(up)
+
+def _changes(category, values, delta, archetype_id):
+    """合計を delta 動かす回答の変更。1問で届くなら番号の若い1問、届かなければ動かせる幅の大きい2問"""
+    step = 1 if delta > 0 else -1
+    room = [(MAX_ANSWER - v if step > 0 else v - MIN_ANSWER, i) for i, v in enumerate(values)]
+    single = next((i for capacity, i in room if capacity >= abs(delta)), None)
+    if single is not None:
+        picked = [(single, abs(delta))]
+    else:
+        picked, left = [], abs(delta)
+        for capacity, i in sorted(room, key=lambda r: (-r[0], r[1]))[:2]:
+            picked.append((i, min(capacity, left)))
+            left -= picked[-1][1]
+    return tuple(
+        Flip(f"{category}_{i}", category, values[i], values[i] + step * moved, archetype_id) for i, moved in sorted(picked)
+    )
+
+def analyze(answers, pairs=False):
+    """48問の回答 (CATEGORY_ORDER 順) について、アーキタイプが変わる回答の変更と最も近い境界を返す
+
+    pairs=True なら、同じカテゴリ内の2問までの変更も境界の候補にする。
+    """
+    answers = [int(a) for a in answers]
+    if len(answers) != N_QUESTIONS:
+        raise ValueError(f"回答は {N_QUESTIONS} 個である必要があります")
+    per_category = [answers[c * QUESTIONS_PER_CATEGORY:(c + 1) * QUESTIONS_PER_CATEGORY] for c in range(len(CATEGORY_ORDER))]
+    sums = [sum(values) for values in per_category]
+
+    # 候補: (カテゴリ, 合計の動き)。先頭行は今の回答
+    max_changed = 2 if pairs else 1
+    reach = [_reach(values, max_changed) for values in per_category]
+    candidates = [(c, d) for c, (lo, hi) in enumerate(reach) for d in range(lo, hi + 1) if d]
+    matrix = np.tile(np.array(sums, dtype=np.int16), (len(candidates) + 1, 1))
+    for row, (c, d) in enumerate(candidates, 1):
+        matrix[row, c] += d
+    ids = classify_sums(matrix).tolist()
+    current, outcome = ids[0], dict(zip(candidates, ids[1:]))
+
+    flips = sorted(
+        (Flip(f"{category}_{i}", category, v, new, outcome[c, new - v])
+         for c, (category, values) in enumerate(zip(CATEGORY_ORDER, per_category))
+         for i, v in enumerate(values)
+         for new in range(MIN_ANSWER, MAX_ANSWER + 1)
+         if new != v and outcome[c, new - v] != current),
+        key=lambda f: (abs(f.to_value - f.from_value), CATEGORY_ORDER.index(f.category), f.question),
+    )
+
+    boundaries = []
+    for c, (category, values) in enumerate(zip(CATEGORY_ORDER, per_category)):
+        lo, hi = reach[c]
+        for direction in (range(-1, lo - 1, -1), range(1, hi + 1)):
+            delta = next((d for d in direction if outcome[c, d] != current), None)
+            if delta is not None:
+                boundaries.append(Boundary(category, delta, outcome[c, delta], _changes(category, values, delta, outcome[c, delta])))
+    boundaries.sort(key=lambda b: (abs(b.delta), CATEGORY_ORDER.index(b.category), b.delta))
+    return Sensitivity(current, flips, boundaries)
+
+
+if __name__ == "__main__":
+    # 使い方: python sensitivity.py [回答48個をカンマ区切り]  (省略時はランダムな回答で所要時間を計測)
+    rng = np.random.default_rng(0)
+    answers = [int(a) for a in sys.argv[1].split(",")] if len(sys.argv) > 1 else rng.integers(1, 6, N_QUESTIONS).tolist()
+    analyze(answers, pairs=True)  # ウォームアップ
+    started = time.perf_counter()
+    report = analyze(answers, pairs=True)
+    print(f"archetype {report.archetype_id}, {len(report.flips)} single-answer flips "
+          f"({(time.perf_counter() - started) * 1000:.2f} ms)")
+    for b in report.boundaries:
+        changes = ", ".join(f"{f.question}: {f.from_value}→{f.to_value}" for f in b.changes)
+        print(f"  {b.category} {b.delta:+d} → Type {b.archetype_id}  ({changes})")
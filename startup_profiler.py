@@ -0,0 +1,157 @@
+# startup_profiler.py
+
+import json
+import os
+import re
+import sys
+import time
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(APP_DIR, "app.py")
+
+# アプリのモジュール = app.py と同じディレクトリにある .py (これ以外は依存ライブラリとして集計)
+APP_MODULES = tuple(sorted(
+    name[:-3] for name in os.listdir(APP_DIR) if name.endswith(".py") and name != "app.py"
+))
+
+
+# --- 1. プロセス内での計測 (アプリ組み込み用) ---
+def process_uptime():
+    """このプロセスが起動してからの秒数 (Linux の /proc から。取得できなければ None)"""
+    try:
+        with open("/proc/self/stat") as f:
+            # comm に空白が入ることがあるので ")" 以降を分割する
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as f:
+            system_uptime = float(f.read().split()[0])
+        started = int(fields[19]) / os.sysconf("SC_CLK_TCK")
+        return system_uptime - started
+    except (OSError, ValueError, IndexError):
+        return None
+
+_first_render_reported = False
+
+def report_first_render(import_seconds, run_seconds):
+    """プロセスで最初の実行が終わった時点で、起動コストを一度だけ標準エラーに出す
+
+    import_seconds: app.py のモジュールの import 時間 (最初の実行なのでキャッシュの効いていない値をプロセス内で実測)
+    run_seconds:    最初の実行のうち import を除いた時間
+    プロセス起動からの経過時間も出すが、streamlit run では最初のブラウザが接続するまでスクリプトは実行されないので
+    待ち時間を含む。レプリカの準備完了 (起動からヘルスチェックが通るまで) は python startup_profiler.py --server で計る
+    """
+    global _first_render_reported
+    if _first_render_reported:
+        return
+    _first_render_reported = True
+    print(f"[startup] cold app imports: {import_seconds * 1000:.1f} ms, first run: {run_seconds * 1000:.1f} ms", file=sys.stderr)
+    uptime = process_uptime()
+    if uptime is not None:
+        print(f"[startup] first session served {uptime:.2f}s after process start (includes idle time before the first visitor)", file=sys.stderr)
+
+
+# --- 2. モジュールごとの import 時間 ---
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+def parse_importtime(stderr):
+    """python -X importtime の出力 → [(モジュール名, 自身の時間 µs, 累積時間 µs, 深さ), ...]"""
+    rows = []
+    for line in stderr.splitlines():
+        m = _IMPORTTIME_LINE.match(line)
+        if m:
+            self_us, cumulative_us, indent, module = m.groups()
+            rows.append((module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return rows
+
+def summarize_imports(rows):
+    """アプリのモジュールは累積時間、それ以外はトップレベルのパッケージ単位で自身の時間を合計"""
+    app = {module: cumulative for module, _, cumulative, _ in rows if module in APP_MODULES}
+    packages = {}
+    for module, self_us, _, _ in rows:
+        if module in APP_MODULES:
+            continue
+        top = module.split(".")[0]
+        packages[top] = packages.get(top, 0) + self_us
+    return app, packages
+
+
+# --- 3. 新しいプロセスでの計測 ---
+# 新しいインタプリタで app.py を初回描画するまで (streamlit の import を含む) を計る
+_FIRST_RENDER_CODE = """
+import time
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({path!r}, default_timeout=120)
+t1 = time.perf_counter()
+at.run()
+t2 = time.perf_counter()
+print({{"import_streamlit_s": t1 - t0, "first_run_s": t2 - t1, "time_to_first_render_s": t2 - t0}})
+"""
+
+def profile_first_render(path=APP_PATH):
+    """新しいプロセスで app.py を1回描画し、(import の計測結果, 描画時間の dict) を返す"""
+    import ast
+    import subprocess
+
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _FIRST_RENDER_CODE.format(path=path)],
+        cwd=os.path.dirname(path), capture_output=True, text=True, check=True,
+    )
+    timings = ast.literal_eval(proc.stdout.strip().splitlines()[-1])
+    return parse_importtime(proc.stderr), timings
+
+def profile_server_ready(path=APP_PATH, port=8599, timeout=60):
+    """streamlit run を起動し、ヘルスチェックが通るまでの秒数を返す (レプリカの準備完了までの目安)"""
+    import subprocess
+    import urllib.request
+
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", path, "--server.headless", "true", "--server.port", str(port)],
+        cwd=os.path.dirname(path), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1) as res:
+                    if res.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.05)
+        return None
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+# --- 4. レポート ---
+def run_profile(server=False, top=10):
+    rows, timings = profile_first_render()
+    app, packages = summarize_imports(rows)
+    report = {
+        "timings_s": timings,
+        "app_modules_ms": {m: us / 1000 for m, us in sorted(app.items(), key=lambda kv: -kv[1])},
+        "packages_ms": {p: us / 1000 for p, us in sorted(packages.items(), key=lambda kv: -kv[1])[:top]},
+    }
+    if server:
+        report["timings_s"]["server_ready_s"] = profile_server_ready()
+    return report
+
+def print_report(report):
+    print("== Startup timings ==")
+    for name, seconds in report["timings_s"].items():
+        print(f"  {name:<26} {seconds:8.3f} s" if seconds is not None else f"  {name:<26}   (timeout)")
+    print("== App modules (cumulative import) ==")
+    for name, ms in report["app_modules_ms"].items():
+        print(f"  {name:<26} {ms:8.1f} ms")
+    print("== Heaviest packages (self import time) ==")
+    for name, ms in report["packages_ms"].items():
+        print(f"  {name:<26} {ms:8.1f} ms")
+
+
+if __name__ == "__main__":
+    # 使い方: python startup_profiler.py [--server] [--json]
+    report = run_profile(server="--server" in sys.argv)
+    if "--json" in sys.argv:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)